@@ -21,12 +21,21 @@ class AudioAnalyzer:
         """
         # Load audio
         y, sr = librosa.load(audio_file, sr=self.sample_rate)
+        y = np.ascontiguousarray(y, dtype=np.float32)
         
         # Extract features
         features = {}
         
+        # One STFT shared by the onset envelope and spectral centroid
+        magnitude = np.abs(librosa.stft(y))
+        power = magnitude ** 2
+        
         # Tempo detection
-        tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
+        onset_env = librosa.onset.onset_strength(
+            S=librosa.power_to_db(librosa.feature.melspectrogram(S=power, sr=sr)),
+            sr=sr
+        )
+        tempo, _ = librosa.beat.beat_track(onset_envelope=onset_env, sr=sr)
         features['tempo'] = float(tempo)
         
         # Key detection (simplified)
@@ -40,7 +49,7 @@ class AudioAnalyzer:
         features['rms_std'] = float(np.std(rms))
         
         # Spectral centroid
-        spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
+        spectral_centroids = librosa.feature.spectral_centroid(S=magnitude, sr=sr)[0]
         features['spectral_centroid_mean'] = float(np.mean(spectral_centroids))
         
         # Zero crossing rate
@@ -1,5 +1,14 @@
 """Audio analyzer module"""
 
+import librosa
+import scipy.fft
+
+# Route librosa's FFTs through scipy.fft so analyzers can spread them over
+# cores with scipy.fft.set_workers (numpy.fft is single-threaded). This is
+# process-wide: importing this package switches every librosa user in the
+# process to scipy.fft.
+librosa.set_fftlib(scipy.fft)
+
 from .spectral import SpectralAnalyzer
 from .loudness import LoudnessAnalyzer
 from .musical import MusicalAnalyzer
@@ -5,25 +5,138 @@ Automatically classifies stems (kick, bass, vocal, etc.)
 
 import numpy as np
 import librosa
-from typing import Dict, Tuple
+import hashlib
+import json
+import os
+import re
+import scipy.fft
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.ndimage import median_filter
+from scipy.signal import get_window
+from typing import Dict, Optional, Tuple, Union
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever _extract_features changes so stale cached features are ignored
+FEATURE_CACHE_VERSION = 2
+
+# Threshold scoring modes (per feature)
+_OP_RATIO = 0       # Ratios/strengths: above threshold is better
+_OP_CENTROID = 1    # Centroids: closer to threshold is better
+_OP_PROXIMITY = 2   # Default: inverse distance to threshold
+
+
+def _score_op(feature_name: str) -> int:
+    """Scoring mode for a threshold feature, based on its name."""
+    if 'ratio' in feature_name or 'presence' in feature_name or 'strength' in feature_name:
+        return _OP_RATIO
+    if 'centroid' in feature_name:
+        return _OP_CENTROID
+    return _OP_PROXIMITY
+
+
+def _score_all(
+    feat_vec: np.ndarray,
+    th_matrix: np.ndarray,
+    th_op: np.ndarray,
+    th_mask: np.ndarray
+) -> np.ndarray:
+    """
+    Table-driven category scoring
+    
+    Args:
+        feat_vec: Feature values, shape (n_features,)
+        th_matrix: Thresholds, shape (n_categories, n_features)
+        th_op: Scoring mode per feature, shape (n_features,)
+        th_mask: Whether a category uses a feature, shape (n_categories, n_features)
+        
+    Returns:
+        Mean score per category (0 when a category has no usable feature)
+    """
+    distance = np.abs(feat_vec - th_matrix)
+    
+    per_feature = np.where(
+        th_op == _OP_RATIO,
+        np.minimum(1.0, feat_vec / th_matrix),
+        np.where(
+            th_op == _OP_CENTROID,
+            np.maximum(0.0, 1.0 - distance / th_matrix),
+            1.0 / (1.0 + distance)
+        )
+    )
+    
+    counts = th_mask.sum(axis=1)
+    totals = np.where(th_mask, per_feature, 0.0).sum(axis=1)
+    
+    return np.divide(totals, counts, out=np.zeros(len(counts)), where=counts > 0)
+
 
 class SourceClassifier:
     """
     Classifies audio stems based on spectral and temporal features
     """
     
-    def __init__(self, sample_rate: int = 48000):
+    # Every feature below is well captured at 16 kHz, so analysis runs there
+    ANALYSIS_SAMPLE_RATE = 16000
+    ANALYSIS_N_FFT = 1024
+    
+    # Features are global averages, so a representative window is enough
+    ANALYSIS_WINDOW_SECONDS = 10
+    
+    # Filename keywords per classification, checked in priority order
+    FILENAME_PATTERNS = [
+        ('kick', ['kick', 'bd', 'bassdrum', '808', 'boom']),
+        ('bass', ['bass', 'sub', 'low end', 'lowend']),
+        ('snare', ['snare', 'sd', 'clap', 'rimshot', 'snr']),
+        ('hihat', ['hi-hat', 'hihat', 'hh', 'hat', 'shaker', 'cymbal', 'ride', 'crash']),
+        ('percussion', ['perc', 'conga', 'bongo', 'tom', 'toms', 'tamb']),
+        ('drums', ['drum', 'drums', 'beat', 'loop']),
+        ('vocal', ['vocal', 'vox', 'voice', 'sing', 'adlib', 'hook', 'verse', 'chorus']),
+        ('synth', ['synth', 'pad', 'lead', 'arp', 'pluck', 'stab', 'chord']),
+        ('piano', ['piano', 'keys', 'keyboard', 'organ', 'rhodes', 'wurli', 'ep']),
+        ('guitar', ['guitar', 'gtr', 'acoustic', 'electric', 'strum']),
+        ('synth', ['string', 'violin', 'cello', 'orchestra']),  # Treat strings as synth for processing
+        ('fx', ['fx', 'effect', 'riser', 'impact', 'sweep', 'noise', 'atmos', 'ambient']),
+    ]
+    
+    def __init__(self, sample_rate: int = 48000, cache_dir: Optional[str] = None):
         """
         Initialize source classifier
         
         Args:
             sample_rate: Audio sample rate
+            cache_dir: Directory for cached stem features (None disables the
+                cache; entries are never evicted, so the caller owns cleanup)
         """
         self.sample_rate = sample_rate
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        
+        # All keywords in one regex, scanned once per name. Each priority
+        # level is a numbered group inside a lookahead so matches are found
+        # at every position, including overlapping ones.
+        self._filename_regex = re.compile('(?=' + '|'.join(
+            f"({'|'.join(map(re.escape, patterns))})"
+            for _, patterns in self.FILENAME_PATTERNS
+        ) + ')')
+        
+        self.analysis_rate = min(sample_rate, self.ANALYSIS_SAMPLE_RATE)
+        
+        # STFT bin layout only depends on the sample rate, so build it once
+        self._freqs = np.fft.rfftfreq(self.ANALYSIS_N_FFT, d=1.0 / self.analysis_rate)
+        
+        # STFT framing (librosa's default hop of n_fft/4), window built once
+        self._hop_length = self.ANALYSIS_N_FFT // 4
+        self._window = get_window('hann', self.ANALYSIS_N_FFT).astype(np.float32)
+        
+        # Bin edges of the low/mid/high energy bands (20-250-4000-8000 Hz)
+        # High band is clamped to the 8 kHz Nyquist of the analysis rate
+        self._band_edges = np.searchsorted(self._freqs, [20, 250, 4000, 8000])
+        
+        # Formant region (500-3000 Hz)
+        self._formant_mask = (self._freqs >= 500) & (self._freqs < 3000)
         
         # Feature thresholds for classification
         self.thresholds = {
@@ -69,6 +182,20 @@ class SourceClassifier:
                 'spectral_centroid': 800       # Mid-low centroid
             }
         }
+        
+        # Same thresholds as dense (category x feature) arrays for scoring
+        self._categories = list(self.thresholds.keys())
+        self._feature_names = sorted({
+            feature for thresholds in self.thresholds.values() for feature in thresholds
+        })
+        self._th_matrix = np.ones((len(self._categories), len(self._feature_names)))
+        self._th_mask = np.zeros(self._th_matrix.shape, dtype=bool)
+        for i, category in enumerate(self._categories):
+            for j, feature_name in enumerate(self._feature_names):
+                if feature_name in self.thresholds[category]:
+                    self._th_matrix[i, j] = self.thresholds[category][feature_name]
+                    self._th_mask[i, j] = True
+        self._th_op = np.array([_score_op(f) for f in self._feature_names], dtype=np.int8)
     
     def classify(
         self,
@@ -88,24 +215,81 @@ class SourceClassifier:
         logger.info(f"Classifying stem: {name}")
         
         # STEP 1: Try to classify by filename FIRST (most reliable!)
-        filename_class = self._classify_by_filename(name)
+        filename_class = self.classify_by_name(name)
         if filename_class:
             logger.info(f"Classified {name} as {filename_class} (from filename)")
             return filename_class, 1.0
         
         # STEP 2: Fall back to audio analysis
+        audio = self._to_mono(audio)
+        
+        # Reuse features from a previous run on the same stem content
+        cache_key = self._cache_key(audio)
+        features = self._load_cached_features(cache_key)
+        
+        if features is None:
+            features = self._extract_features(self._analysis_audio(audio))
+            self._store_cached_features(cache_key, features)
+        
+        return self._best_category(features, name)
+    
+    def _to_mono(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Downmix to mono, contiguous float32
+        
+        Args:
+            audio: Audio signal (mono or channels x samples)
+            
+        Returns:
+            Mono float32 audio signal
+        """
         # Convert stereo to mono if needed
         if audio.ndim > 1:
-            audio = np.mean(audio, axis=0)
+            if audio.shape[0] == 2:
+                # One streaming add + in-place scale for the common stereo case
+                audio = np.add(audio[0], audio[1], dtype=np.float32)
+                audio *= 0.5
+            else:
+                audio = np.mean(audio, axis=0)
         
-        # Extract features
-        features = self._extract_features(audio)
+        # Contiguous float32 halves the bytes every FFT/filter pass moves
+        return np.ascontiguousarray(audio, dtype=np.float32)
+    
+    def _analysis_audio(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Prepare a mono stem for feature extraction
         
-        # Score each category
-        scores = {}
-        for category in self.thresholds.keys():
-            score = self._score_category(features, category)
-            scores[category] = score
+        Args:
+            audio: Mono float32 audio signal at the stem sample rate
+            
+        Returns:
+            Loudest analysis window at the analysis rate
+        """
+        # Downsample once; STFT/median filter/onset cost scales with length
+        if self.sample_rate != self.analysis_rate:
+            audio = librosa.resample(
+                audio,
+                orig_sr=self.sample_rate,
+                target_sr=self.analysis_rate,
+                res_type='polyphase'
+            )
+        
+        # Bound the analysis to the loudest window of the stem
+        return self._analysis_window(audio)
+    
+    def _best_category(self, features: Dict, name: str) -> Tuple[str, float]:
+        """
+        Pick the classification for a set of extracted features
+        
+        Args:
+            features: Extracted features
+            name: Stem name (for logging)
+            
+        Returns:
+            Tuple of (classification, confidence)
+        """
+        # Score all categories at once
+        scores = self._score_categories(features)
         
         # Get best match
         best_category = max(scores, key=scores.get)
@@ -115,10 +299,13 @@ class SourceClassifier:
         
         return best_category, confidence
     
-    def _classify_by_filename(self, name: str) -> str:
+    def classify_by_name(self, name: str) -> Optional[str]:
         """
         Classify stem by filename keywords
         
+        Cheap enough to run before any audio is decoded, so callers
+        can skip loading/analysis entirely for matched stems.
+        
         Args:
             name: Stem/file name
             
@@ -127,118 +314,163 @@ class SourceClassifier:
         """
         name_lower = name.lower()
         
-        # Kick/drums patterns
-        kick_patterns = ['kick', 'bd', 'bassdrum', '808', 'boom']
-        for p in kick_patterns:
-            if p in name_lower:
-                return 'kick'
-        
-        # Bass patterns
-        bass_patterns = ['bass', 'sub', 'low end', 'lowend']
-        for p in bass_patterns:
-            if p in name_lower:
-                return 'bass'
-        
-        # Snare patterns
-        snare_patterns = ['snare', 'sd', 'clap', 'rimshot', 'snr']
-        for p in snare_patterns:
-            if p in name_lower:
-                return 'snare'
-        
-        # Hi-hat patterns
-        hihat_patterns = ['hi-hat', 'hihat', 'hh', 'hat', 'shaker', 'cymbal', 'ride', 'crash']
-        for p in hihat_patterns:
-            if p in name_lower:
-                return 'hihat'
-        
-        # Percussion patterns
-        perc_patterns = ['perc', 'conga', 'bongo', 'tom', 'toms', 'tamb']
-        for p in perc_patterns:
-            if p in name_lower:
-                return 'percussion'
-        
-        # Drums (general)
-        drum_patterns = ['drum', 'drums', 'beat', 'loop']
-        for p in drum_patterns:
-            if p in name_lower:
-                return 'drums'
-        
-        # Vocal patterns
-        vocal_patterns = ['vocal', 'vox', 'voice', 'sing', 'adlib', 'hook', 'verse', 'chorus']
-        for p in vocal_patterns:
-            if p in name_lower:
-                return 'vocal'
-        
-        # Synth patterns
-        synth_patterns = ['synth', 'pad', 'lead', 'arp', 'pluck', 'stab', 'chord']
-        for p in synth_patterns:
-            if p in name_lower:
-                return 'synth'
-        
-        # Piano/keys patterns
-        piano_patterns = ['piano', 'keys', 'keyboard', 'organ', 'rhodes', 'wurli', 'ep']
-        for p in piano_patterns:
-            if p in name_lower:
-                return 'piano'
-        
-        # Guitar patterns
-        guitar_patterns = ['guitar', 'gtr', 'acoustic', 'electric', 'strum']
-        for p in guitar_patterns:
-            if p in name_lower:
-                return 'guitar'
-        
-        # Strings patterns
-        strings_patterns = ['string', 'violin', 'cello', 'orchestra']
-        for p in strings_patterns:
-            if p in name_lower:
-                return 'synth'  # Treat strings as synth for processing
-        
-        # FX patterns
-        fx_patterns = ['fx', 'effect', 'riser', 'impact', 'sweep', 'noise', 'atmos', 'ambient']
-        for p in fx_patterns:
-            if p in name_lower:
-                return 'fx'
+        # Lowest priority index among all keyword hits wins
+        best = None
+        for match in self._filename_regex.finditer(name_lower):
+            priority = match.lastindex - 1
+            if best is None or priority < best:
+                best = priority
+        
+        if best is not None:
+            return self.FILENAME_PATTERNS[best][0]
         
         # No match - return None to trigger audio analysis
         return None
     
-    def _extract_features(self, audio: np.ndarray) -> Dict:
+    def _cache_key(self, audio: np.ndarray) -> Optional[str]:
+        """
+        Content hash identifying a mono stem for the feature cache
+        
+        Hashes the whole buffer: stems from one session commonly share
+        length and silent intros/outros, so partial hashes would collide.
+        
+        Args:
+            audio: Mono float32 audio signal
+            
+        Returns:
+            Hex digest, or None when the cache is disabled
+        """
+        if self.cache_dir is None:
+            return None
+        
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{FEATURE_CACHE_VERSION}:{self.sample_rate}:{len(audio)}:".encode())
+        digest.update(audio.tobytes())
+        return digest.hexdigest()
+    
+    def _load_cached_features(self, key: Optional[str]) -> Optional[Dict]:
+        """Load cached features for a stem, or None if not cached."""
+        if key is None:
+            return None
+        
+        path = self.cache_dir / f"{key}.json"
+        if not path.exists():
+            return None
+        
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable feature cache entry {path}: {e}")
+            return None
+    
+    def _store_cached_features(self, key: Optional[str], features: Dict) -> None:
+        """Persist extracted features for a stem (no-op when the cache is disabled)."""
+        if key is None:
+            return
+        
+        path = self.cache_dir / f"{key}.json"
+        
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump({k: float(v) for k, v in features.items()}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write feature cache entry {path}: {e}")
+    
+    def _analysis_window(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Select the loudest ANALYSIS_WINDOW_SECONDS of a stem
+        
+        Loudest rather than centred, so stems that are silent for long
+        stretches are still analyzed where they actually play.
+        
+        Args:
+            audio: Mono audio signal at the analysis rate
+            
+        Returns:
+            Audio window (the input itself if already short enough)
+        """
+        window = int(self.ANALYSIS_WINDOW_SECONDS * self.analysis_rate)
+        if len(audio) <= window:
+            return audio
+        
+        # Block energies at 100 ms resolution, then a sliding window sum
+        block = self.analysis_rate // 10
+        n_blocks = len(audio) // block
+        blocks = audio[:n_blocks * block].reshape(n_blocks, block)
+        block_energy = np.einsum('ij,ij->i', blocks, blocks)
+        
+        window_blocks = window // block
+        cumulative = np.concatenate(([0.0], np.cumsum(block_energy, dtype=np.float64)))
+        window_energy = cumulative[window_blocks:] - cumulative[:-window_blocks]
+        
+        start = int(np.argmax(window_energy)) * block
+        return audio[start:start + window]
+    
+    def _stft_magnitude(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Magnitude STFT over the last axis, batched over any leading axes
+        
+        Same framing as librosa.stft (centered, zero-padded, periodic Hann),
+        but all frames of all stems go through a single threaded rfft.
+        
+        Args:
+            audio: Audio at the analysis rate, shape (..., n_samples)
+            
+        Returns:
+            Magnitude spectrogram, shape (..., n_bins, n_frames)
+        """
+        n_fft = self.ANALYSIS_N_FFT
+        
+        padding = [(0, 0)] * (audio.ndim - 1) + [(n_fft // 2, n_fft // 2)]
+        padded = np.pad(audio, padding)
+        frames = sliding_window_view(padded, n_fft, axis=-1)[..., ::self._hop_length, :]
+        
+        spectrum = scipy.fft.rfft(frames * self._window, axis=-1, workers=-1)
+        
+        return np.abs(spectrum).swapaxes(-1, -2)
+    
+    def _extract_features(
+        self,
+        audio: np.ndarray,
+        magnitude: Optional[np.ndarray] = None
+    ) -> Dict:
         """
         Extract classification features from audio
         
         Args:
-            audio: Audio signal
+            audio: Mono analysis window at the analysis rate
+            magnitude: Precomputed magnitude STFT of audio (e.g. from a batch)
             
         Returns:
             Dictionary of features
         """
         features = {}
         
-        # Spectral features
-        stft = librosa.stft(audio)
-        magnitude = np.abs(stft)
+        # Spectral features (one STFT shared by every spectral feature below)
+        if magnitude is None:
+            magnitude = self._stft_magnitude(audio)
+        magnitude = np.ascontiguousarray(magnitude)
+        power = magnitude * magnitude
         
         # Spectral centroid
         centroid = librosa.feature.spectral_centroid(
-            y=audio,
-            sr=self.sample_rate
+            S=magnitude,
+            sr=self.analysis_rate
         )
         features['spectral_centroid'] = np.mean(centroid)
         
         # Energy distribution by frequency bands
-        freqs = librosa.fft_frequencies(sr=self.sample_rate)
-        
-        # Low energy (20-250 Hz)
-        low_mask = (freqs >= 20) & (freqs < 250)
-        low_energy = np.sum(magnitude[low_mask, :])
-        
-        # Mid energy (250-4000 Hz)
-        mid_mask = (freqs >= 250) & (freqs < 4000)
-        mid_energy = np.sum(magnitude[mid_mask, :])
-        
-        # High energy (4000-20000 Hz)
-        high_mask = (freqs >= 4000) & (freqs < 20000)
-        high_energy = np.sum(magnitude[high_mask, :])
+        # Low (20-250 Hz), mid (250-4000 Hz), high (4000-8000 Hz)
+        # Per-bin sums are the only full pass over the magnitude; band and
+        # formant energies are both read from them
+        row_sums = magnitude.sum(axis=1)
+        low_energy, mid_energy, high_energy = np.add.reduceat(
+            row_sums[:self._band_edges[3]], self._band_edges[:3]
+        )
         
         total_energy = low_energy + mid_energy + high_energy + 1e-10
         
@@ -247,32 +479,38 @@ class SourceClassifier:
         features['high_energy_ratio'] = high_energy / total_energy
         
         # Harmonic vs percussive
-        harmonic, percussive = librosa.effects.hpss(audio)
-        
-        harmonic_energy = np.sum(harmonic ** 2)
-        percussive_energy = np.sum(percussive ** 2)
+        # Median-filter masks on the existing magnitude (no extra STFT/iSTFT)
+        harmonic = median_filter(magnitude, size=(1, 31))
+        percussive = median_filter(magnitude, size=(31, 1))
+        harmonic_mask = harmonic > percussive
+        
+        # Masked reduction in place; no copies of the selected bins
+        harmonic_energy = float(np.sum(power, where=harmonic_mask))
+        percussive_energy = float(np.sum(power)) - harmonic_energy
         total_hp_energy = harmonic_energy + percussive_energy + 1e-10
         
         features['harmonic_ratio'] = harmonic_energy / total_hp_energy
         features['percussive_ratio'] = percussive_energy / total_hp_energy
         
         # Transient strength
+        mel_power = librosa.feature.melspectrogram(S=power, sr=self.analysis_rate)
         onset_env = librosa.onset.onset_strength(
-            y=audio,
-            sr=self.sample_rate
+            S=librosa.power_to_db(mel_power),
+            sr=self.analysis_rate
         )
         features['transient_strength'] = np.mean(onset_env) / (np.max(onset_env) + 1e-10)
         
         # Formant presence (for vocals)
         # Check for energy peaks in formant regions (500-3000 Hz)
-        formant_mask = (freqs >= 500) & (freqs < 3000)
-        formant_spectrum = np.mean(magnitude[formant_mask, :], axis=1)
+        formant_spectrum = row_sums[self._formant_mask] / magnitude.shape[1]
         
-        # Detect peaks in formant region
-        from scipy.signal import find_peaks
-        peaks, _ = find_peaks(formant_spectrum, height=np.mean(formant_spectrum))
+        # Detect peaks in formant region (local maxima above the mean)
+        fs = formant_spectrum
+        n_peaks = int(np.count_nonzero(
+            (fs[1:-1] > fs[:-2]) & (fs[1:-1] > fs[2:]) & (fs[1:-1] >= fs.mean())
+        ))
         
-        features['formant_presence'] = len(peaks) / 10.0  # Normalize
+        features['formant_presence'] = n_peaks / 10.0  # Normalize
         
         # Zero crossing rate (for noise/hi-hats)
         zcr = librosa.feature.zero_crossing_rate(audio)
@@ -280,86 +518,131 @@ class SourceClassifier:
         
         return features
     
-    def _score_category(
-        self,
-        features: Dict,
-        category: str
-    ) -> float:
+    def _score_categories(self, features: Dict) -> Dict[str, float]:
         """
-        Score how well features match a category
+        Score how well features match every category
         
         Args:
             features: Extracted features
-            category: Category to score
             
         Returns:
-            Score (0-1)
+            Dictionary of {category: score (0-1)}
+        """
+        feat_vec = np.array([features.get(f, np.nan) for f in self._feature_names])
+        mask = self._th_mask & ~np.isnan(feat_vec)
+        
+        scores = _score_all(feat_vec, self._th_matrix, self._th_op, mask)
+        
+        return dict(zip(self._categories, scores.tolist()))
+    
+    def classify_multiple(
+        self,
+        stems: Dict[str, Union[np.ndarray, str]]
+    ) -> Dict[str, Tuple[str, float]]:
         """
-        thresholds = self.thresholds[category]
+        Classify multiple stems
         
-        scores = []
+        Stems whose name matches a filename keyword are classified
+        without touching their audio; file paths are only decoded
+        when audio analysis is actually needed.
         
-        # Check each threshold
-        for feature_name, threshold in thresholds.items():
-            if feature_name not in features:
-                continue
+        Args:
+            stems: Dictionary of {name: audio} or {name: file_path}
             
-            feature_value = features[feature_name]
+        Returns:
+            Dictionary of {name: (classification, confidence)}
+        """
+        if not stems:
+            return {}
+        
+        # Stems are independent and librosa/numpy release the GIL in the
+        # heavy work, so threads scale without copying the audio
+        max_workers = min(len(stems), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            prepared = list(executor.map(self._prepare_one, stems.items()))
             
-            # Different scoring based on feature type
-            if 'ratio' in feature_name or 'presence' in feature_name:
-                # For ratios, check if above threshold
-                if feature_value >= threshold:
-                    score = min(1.0, feature_value / threshold)
-                else:
-                    score = feature_value / threshold
+            # Stems still needing analysis: one batched STFT per window length
+            # (aligned sessions give every stem the same window length)
+            pending = [item for item in prepared if item[1] is None]
+            by_length = {}
+            for name, _, _, audio in pending:
+                by_length.setdefault(len(audio), []).append((name, audio))
             
-            elif 'centroid' in feature_name or 'strength' in feature_name:
-                # For centroids, check proximity
-                if 'centroid' in feature_name:
-                    # Closer to threshold is better
-                    distance = abs(feature_value - threshold)
-                    max_distance = threshold  # Normalize by threshold
-                    score = max(0, 1.0 - (distance / max_distance))
-                else:
-                    # For strength, check if above threshold
-                    if feature_value >= threshold:
-                        score = min(1.0, feature_value / threshold)
-                    else:
-                        score = feature_value / threshold
+            magnitudes = {}
+            for group in by_length.values():
+                batch = self._stft_magnitude(np.stack([audio for _, audio in group]))
+                for (name, _), magnitude in zip(group, batch):
+                    magnitudes[name] = magnitude
             
-            else:
-                # Default: proximity scoring
-                score = 1.0 / (1.0 + abs(feature_value - threshold))
+            futures = [
+                executor.submit(self._classify_prepared, name, cache_key, audio, magnitudes[name])
+                for name, _, cache_key, audio in pending
+            ]
+            analyzed = dict(future.result() for future in futures)
+        
+        return {
+            name: result if result is not None else analyzed[name]
+            for name, result, _, _ in prepared
+        }
+    
+    def _prepare_one(
+        self,
+        item: Tuple[str, Union[np.ndarray, str]]
+    ) -> Tuple[str, Optional[Tuple[str, float]], Optional[str], Optional[np.ndarray]]:
+        """
+        Classify a stem from its name or cached features if possible
+        
+        Args:
+            item: Tuple of (name, audio or file_path)
             
-            scores.append(score)
+        Returns:
+            Tuple of (name, (classification, confidence) or None,
+            cache_key, analysis audio) - the last two only when the
+            stem still needs feature extraction
+        """
+        name, audio = item
+        
+        filename_class = self.classify_by_name(name)
+        if filename_class:
+            logger.info(f"Classified {name} as {filename_class} (from filename)")
+            return name, (filename_class, 1.0), None, None
+        
+        if isinstance(audio, str):
+            audio, _ = librosa.load(audio, sr=self.sample_rate, mono=True)
+        
+        logger.info(f"Classifying stem: {name}")
+        audio = self._to_mono(audio)
         
-        # Average score
-        if scores:
-            return np.mean(scores)
-        else:
-            return 0.0
+        cache_key = self._cache_key(audio)
+        features = self._load_cached_features(cache_key)
+        if features is not None:
+            return name, self._best_category(features, name), None, None
+        
+        return name, None, cache_key, self._analysis_audio(audio)
     
-    def classify_multiple(
+    def _classify_prepared(
         self,
-        stems: Dict[str, np.ndarray]
-    ) -> Dict[str, Tuple[str, float]]:
+        name: str,
+        cache_key: Optional[str],
+        audio: np.ndarray,
+        magnitude: np.ndarray
+    ) -> Tuple[str, Tuple[str, float]]:
         """
-        Classify multiple stems
+        Finish classifying a stem whose STFT was computed in a batch
         
         Args:
-            stems: Dictionary of {name: audio}
+            name: Stem name
+            cache_key: Feature cache key of the stem (None if caching is off)
+            audio: Analysis window at the analysis rate
+            magnitude: Magnitude STFT of the analysis window
             
         Returns:
-            Dictionary of {name: (classification, confidence)}
+            Tuple of (name, (classification, confidence))
         """
-        classifications = {}
-        
-        for name, audio in stems.items():
-            classification, confidence = self.classify(audio, name)
-            classifications[name] = (classification, confidence)
+        features = self._extract_features(audio, magnitude)
+        self._store_cached_features(cache_key, features)
         
-        return classifications
+        return name, self._best_category(features, name)
     
     def get_stem_roles(
         self,
@@ -5,8 +5,10 @@ Now with better support for House/Electronic genres
 """
 
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from scipy import signal
-from scipy.fft import fft, fftfreq
+from scipy.fft import rfft, rfftfreq
+from numpy.lib.stride_tricks import sliding_window_view
 from typing import Dict, Tuple, Optional
 import logging
 
@@ -86,8 +88,130 @@ class GenreDetector:
         }
     }
     
-    def __init__(self, sample_rate: int = 48000):
+    # Genre scoring rules: each genre lists (feature, tiers) rules and each
+    # tier is a (low, high, weight) range. Tiers are tried in order and the
+    # first match scores, so a rule adds at most one weight. Tempo ranges
+    # include their bounds, all other bounds are strict.
+    GENRE_RULES = {
+        # HOUSE / AFRO HOUSE (118-130 BPM) - TEMPO IS KING
+        'house': [
+            # Tempo is VERY important for house - 50% weight:
+            # perfect, good, acceptable house tempo
+            ('tempo', [(120, 128, 0.50), (118, 130, 0.40), (115, 133, 0.25)]),
+            ('bass_ratio', [(0.15, np.inf, 0.20)]),          # Groovy bass
+            ('mid_ratio', [(-np.inf, 0.45, 0.15)]),          # Not mid-heavy (unlike rock)
+            ('transient_density', [(0.25, np.inf, 0.10)]),   # Percussive
+            ('four_on_floor_score', [(0.4, np.inf, 0.15)]),  # Four-on-floor bonus
+        ],
+        # TECHNO / TECH HOUSE (125-145 BPM)
+        'techno': [
+            ('tempo', [(128, 140, 0.45), (125, 145, 0.35)]),
+            ('bass_ratio', [(0.18, np.inf, 0.20)]),
+            ('mid_ratio', [(-np.inf, 0.40, 0.15)]),
+            ('four_on_floor_score', [(0.4, np.inf, 0.15)]),
+        ],
+        # EDM / ELECTRONIC (128-160 BPM, high energy)
+        'edm': [
+            ('tempo', [(128, 150, 0.40), (125, 160, 0.30)]),
+            ('bass_ratio', [(0.20, np.inf, 0.20)]),
+            ('crest_factor', [(-np.inf, 6, 0.15)]),          # EDM often compressed
+            ('high_ratio', [(0.10, np.inf, 0.15)]),
+        ],
+        # HIP-HOP (70-100 BPM, heavy sub-bass)
+        'hiphop': [
+            ('tempo', [(75, 95, 0.45), (70, 100, 0.35), (65, 110, 0.15)]),
+            ('sub_bass_ratio', [(0.06, np.inf, 0.25)]),      # Heavy sub-bass
+            ('bass_ratio', [(0.25, np.inf, 0.15)]),
+        ],
+        # POP (100-125 BPM, balanced)
+        'pop': [
+            ('tempo', [(100, 125, 0.30)]),
+            ('bass_ratio', [(0.12, 0.28, 0.20)]),            # Balanced spectrum
+            ('mid_ratio', [(0.25, 0.45, 0.15)]),
+            ('brightness', [(0.4, np.inf, 0.15)]),
+            ('presence_ratio', [(0.08, np.inf, 0.15)]),      # Vocal presence
+        ],
+        # ROCK (100-145 BPM, mid-heavy, VERY dynamic)
+        'rock': [
+            ('tempo', [(100, 145, 0.10)]),                   # Tempo contributes less
+            ('mid_ratio', [(0.50, np.inf, 0.30), (0.45, np.inf, 0.15)]),  # Guitars
+            ('crest_factor', [(7, np.inf, 0.25), (5, np.inf, 0.10)]),
+            ('dynamic_range_db', [(18, np.inf, 0.20), (14, np.inf, 0.10)]),
+            ('sub_bass_ratio', [(-np.inf, 0.04, 0.15)]),     # Acoustic instruments
+        ],
+        # R&B / SOUL (60-95 BPM, warm, smooth)
+        'rnb': [
+            ('tempo', [(65, 95, 0.40), (60, 100, 0.25)]),
+            ('bass_ratio', [(0.15, 0.28, 0.20)]),
+            ('brightness', [(-np.inf, 0.6, 0.15)]),
+            ('presence_ratio', [(0.08, np.inf, 0.15)]),
+        ],
+        # ACOUSTIC (natural dynamics, mid-focused)
+        'acoustic': [
+            ('dynamic_range_db', [(20, np.inf, 0.35), (16, np.inf, 0.20)]),
+            ('crest_factor', [(8, np.inf, 0.30), (6, np.inf, 0.15)]),
+            ('sub_bass_ratio', [(-np.inf, 0.03, 0.20)]),     # Low bass
+            ('transient_density', [(-np.inf, 0.25, 0.15)]),  # Less percussive
+        ],
+    }
+    
+    # Spectrum analysis settings and band edges (Hz):
+    # sub-bass, bass, low-mid, mid, high-mid, high
+    SPECTRUM_N_FFT = 4096
+    SPECTRUM_BAND_EDGES = (20, 60, 250, 500, 2000, 6000, 20000)
+    SPECTRUM_BLOCK_FRAMES = 128  # Frames per FFT batch (~2 MB of float32)
+    SPECTRUM_WINDOW = np.hanning(SPECTRUM_N_FFT).astype(np.float32)
+    
+    # Tempo and kick-pattern detection only need content below ~200 Hz
+    BEAT_DECIMATION = 8
+    
+    # A four-on-floor score this high within this tempo range makes the beat
+    # conclusive: genre is scored from tempo and kick pattern alone
+    CONCLUSIVE_TEMPO_RANGE = (118, 145)
+    CONCLUSIVE_FOUR_ON_FLOOR = 0.6
+    
+    def __init__(self, sample_rate: int = 48000, early_exit: bool = False):
+        """
+        Args:
+            sample_rate: Audio sample rate
+            early_exit: Skip the spectral, dynamics and transient analyses
+                        when the beat alone is conclusive (the result's
+                        'analysis' then only holds tempo, four_on_floor_score
+                        and estimated_energy)
+        """
         self.sample_rate = sample_rate
+        self.early_exit = early_exit
+        
+        # Band edge bins, rebuilt whenever sample_rate changes
+        self._band_bins = None
+        self._band_bins_rate = None
+        
+        # Kick low-pass (sections, delay in samples) keyed by the rate they
+        # were designed for
+        self._kick_filters = {}
+        
+        # Flatten GENRE_RULES into per-tier arrays; tiers of one rule are
+        # contiguous, starting at _rule_starts
+        self._rule_features = sorted({
+            feature for rules in self.GENRE_RULES.values() for feature, _ in rules
+        })
+        tiers, rule_starts, rule_genre = [], [], []
+        for genre_idx, rules in enumerate(self.GENRE_RULES.values()):
+            for feature, feature_tiers in rules:
+                rule_starts.append(len(tiers))
+                rule_genre.append(genre_idx)
+                feature_idx = self._rule_features.index(feature)
+                tiers += [(feature_idx, *tier) for tier in feature_tiers]
+        
+        self._tier_feature = np.array([t[0] for t in tiers])
+        self._tier_low = np.array([t[1] for t in tiers], dtype=float)
+        self._tier_high = np.array([t[2] for t in tiers], dtype=float)
+        self._tier_weight = np.array([t[3] for t in tiers], dtype=float)
+        self._tier_inclusive = np.array(
+            [self._rule_features[t[0]] == 'tempo' for t in tiers]
+        )
+        self._rule_starts = np.array(rule_starts)
+        self._rule_genre = np.array(rule_genre)
     
     def detect_genre(self, audio: np.ndarray) -> Dict:
         """
@@ -101,23 +225,43 @@ class GenreDetector:
         """
         logger.info("Starting genre detection analysis...")
         
-        # Convert to mono for analysis
+        # Convert to mono for analysis (stereo: one add pass, scaled in place)
         if audio.ndim > 1:
-            mono = np.mean(audio, axis=0) if audio.shape[0] == 2 else audio[0]
+            if audio.shape[0] == 2:
+                mono = np.add(audio[0], audio[1], dtype=np.float32)
+                mono *= 0.5
+            else:
+                mono = audio[0]
         else:
             mono = audio
         
+        # float32 is ample precision for these features at half the bandwidth
+        mono = np.ascontiguousarray(mono, dtype=np.float32)
+        
+        # Integer PCM (e.g. 16-bit WAV data): scale the float32 copy made above
+        # to full scale, so levels and thresholds match float input. Unsigned
+        # PCM (8-bit WAV) is centred on the middle of its range.
+        if np.issubdtype(audio.dtype, np.integer):
+            info = np.iinfo(audio.dtype)
+            half_range = (int(info.max) - int(info.min) + 1) / 2
+            if info.min == 0:
+                mono -= half_range
+            mono *= 1.0 / half_range
+        
         # Analyze audio characteristics
-        analysis = self._analyze_audio(mono)
+        analysis = self._analyze_audio(mono, stop_if_conclusive=self.early_exit)
         
         # Log analysis results for debugging
         logger.info(f"  Analysis results:")
         logger.info(f"    Tempo: {analysis['tempo']:.1f} BPM")
-        logger.info(f"    Bass ratio: {analysis['bass_ratio']:.3f}")
-        logger.info(f"    Sub-bass ratio: {analysis['sub_bass_ratio']:.3f}")
-        logger.info(f"    Mid ratio: {analysis['mid_ratio']:.3f}")
-        logger.info(f"    Crest factor: {analysis['crest_factor']:.2f}")
-        logger.info(f"    Transient density: {analysis['transient_density']:.2f}")
+        if 'bass_ratio' in analysis:
+            logger.info(f"    Bass ratio: {analysis['bass_ratio']:.3f}")
+            logger.info(f"    Sub-bass ratio: {analysis['sub_bass_ratio']:.3f}")
+            logger.info(f"    Mid ratio: {analysis['mid_ratio']:.3f}")
+            logger.info(f"    Crest factor: {analysis['crest_factor']:.2f}")
+            logger.info(f"    Transient density: {analysis['transient_density']:.2f}")
+        else:
+            logger.info("    Conclusive beat - spectral/dynamics analysis skipped")
         logger.info(f"    Four-on-floor score: {analysis.get('four_on_floor_score', 0):.2f}")
         
         # Score each genre
@@ -165,109 +309,182 @@ class GenreDetector:
             'analysis': analysis
         }
     
-    def _analyze_audio(self, audio: np.ndarray) -> Dict:
-        """Perform comprehensive audio analysis."""
-        
-        analysis = {}
-        
-        # 1. Tempo detection
-        analysis['tempo'] = self._detect_tempo(audio)
+    def _analyze_audio(self, audio: np.ndarray, stop_if_conclusive: bool = False) -> Dict:
+        """
+        Perform comprehensive audio analysis.
         
-        # 2. Four-on-floor detection (for house/techno)
-        analysis['four_on_floor_score'] = self._detect_four_on_floor(audio, analysis['tempo'])
+        Args:
+            audio: Mono audio
+            stop_if_conclusive: Skip the spectral, dynamics and transient
+                                analyses when tempo and four-on-floor score
+                                already decide the genre
         
-        # 3. Spectral balance
-        spectral = self._analyze_spectrum(audio)
-        analysis.update(spectral)
+        Returns:
+            Dict of features. With a conclusive early exit it only holds
+            tempo, four_on_floor_score and estimated_energy; features that
+            were not analysed score as NaN in _calculate_genre_scores.
+        """
         
-        # 4. Dynamic range
-        dynamics = self._analyze_dynamics(audio)
-        analysis.update(dynamics)
+        analysis = {}
         
-        # 5. Transient density
-        analysis['transient_density'] = self._detect_transients(audio)
+        # The spectral, dynamics and transient analyses (3-5) are independent
+        # NumPy/SciPy work that releases the GIL, so they run on worker
+        # threads; without an early exit they overlap the beat analyses too
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            def start_level_analyses():
+                return [
+                    executor.submit(analysis_fn, audio)
+                    for analysis_fn in (
+                        self._analyze_spectrum,
+                        self._analyze_dynamics,
+                        self._detect_transients
+                    )
+                ]
+            
+            futures = None if stop_if_conclusive else start_level_analyses()
+            
+            # Decimated copy for the beat analyses (too short to filter: keep as is)
+            decimation = self.BEAT_DECIMATION
+            if len(audio) > decimation * 64:
+                beat_audio = signal.decimate(audio, decimation, ftype='iir', zero_phase=True)
+            else:
+                beat_audio, decimation = audio, 1
+            
+            # 1. Tempo detection
+            analysis['tempo'] = self._detect_tempo(beat_audio, decimation)
+            
+            # 2. Four-on-floor detection (for house/techno)
+            analysis['four_on_floor_score'] = self._detect_four_on_floor(
+                beat_audio, analysis['tempo'], decimation
+            )
+            
+            low, high = self.CONCLUSIVE_TEMPO_RANGE
+            conclusive = (
+                stop_if_conclusive and low <= analysis['tempo'] <= high
+                and analysis['four_on_floor_score'] > self.CONCLUSIVE_FOUR_ON_FLOOR
+            )
+            
+            if not conclusive:
+                if futures is None:
+                    futures = start_level_analyses()
+                spectral, dynamics, transients = futures
+                
+                # 3. Spectral balance
+                analysis.update(spectral.result())
+                
+                # 4. Dynamic range
+                analysis.update(dynamics.result())
+                
+                # 5. Transient density
+                analysis['transient_density'] = transients.result()
         
         # 6. Energy
         analysis['estimated_energy'] = float(np.mean(np.abs(audio)))
         
         return analysis
     
-    def _detect_tempo(self, audio: np.ndarray) -> float:
-        """Detect tempo using onset detection and autocorrelation."""
+    def _detect_tempo(self, audio: np.ndarray, decimation: int = 1) -> float:
+        """
+        Detect tempo using onset detection and autocorrelation.
         
-        hop = 512
-        window = 1024
+        Args:
+            audio: Mono audio, decimated by `decimation` from sample_rate
+            decimation: Integer decimation factor already applied to audio
+        """
+        
+        hop = 512 // decimation
+        window = 1024 // decimation
+        sample_rate = self.sample_rate / decimation
         
-        # Calculate onset envelope
-        onset_env = []
-        for i in range(0, len(audio) - window, hop):
-            frame = audio[i:i+window]
-            energy = np.sum(frame ** 2)
-            onset_env.append(energy)
+        # Calculate onset envelope (frame energies over a strided view)
+        n_frames = len(range(0, len(audio) - window, hop))
+        if n_frames == 0:
+            return 120.0  # Default
         
-        onset_env = np.array(onset_env)
+        frames = sliding_window_view(audio, window)[::hop][:n_frames]
+        onset_env = np.einsum('ij,ij->i', frames, frames)
         
-        if np.max(onset_env) > 0:
-            onset_env = onset_env / np.max(onset_env)
+        peak = onset_env.max()
+        if peak > 0:
+            onset_env /= peak
         
         # Autocorrelation for tempo
         if len(onset_env) > 100:
-            corr = np.correlate(onset_env, onset_env, mode='full')
-            corr = corr[len(corr)//2:]
+            n = len(onset_env)
             
             # Find peaks in BPM range (60-200 BPM)
-            min_lag = int(60 * self.sample_rate / hop / 200)  # 200 BPM
-            max_lag = int(60 * self.sample_rate / hop / 60)   # 60 BPM
+            min_lag = int(60 * sample_rate / hop / 200)  # 200 BPM
+            max_lag = int(60 * sample_rate / hop / 60)   # 60 BPM
             
-            if max_lag < len(corr):
-                search_region = corr[min_lag:max_lag]
+            if max_lag < n:
+                # Autocorrelation at the searched lags only (~65 BLAS dot
+                # products, cheaper than a full-range FFT correlation)
+                search_region = np.array([
+                    np.dot(onset_env[:n - lag], onset_env[lag:])
+                    for lag in range(min_lag, max_lag)
+                ])
                 if len(search_region) > 0:
                     peak_idx = np.argmax(search_region) + min_lag
                     if peak_idx > 0:
-                        tempo = 60 * self.sample_rate / hop / peak_idx
+                        tempo = 60 * sample_rate / hop / peak_idx
                         return float(np.clip(tempo, 60, 200))
         
         return 120.0  # Default
     
-    def _detect_four_on_floor(self, audio: np.ndarray, tempo: float) -> float:
+    def _detect_four_on_floor(
+        self,
+        audio: np.ndarray,
+        tempo: float,
+        decimation: int = 1
+    ) -> float:
         """
         Detect if the track has a four-on-the-floor kick pattern.
         This is characteristic of house, techno, and similar genres.
+        
+        Args:
+            audio: Mono audio, decimated by `decimation` from sample_rate
+            tempo: Detected tempo in BPM
+            decimation: Integer decimation factor already applied to audio
         """
         if tempo < 100 or tempo > 150:
             return 0.0
         
+        sample_rate = self.sample_rate / decimation
+        
         # Calculate beat duration in samples
-        beat_samples = int(self.sample_rate * 60 / tempo)
+        beat_samples = int(sample_rate * 60 / tempo)
         
         # Low-pass filter to isolate kick
         try:
-            nyq = self.sample_rate / 2
-            low = 100 / nyq
-            b, a = signal.butter(4, low, btype='low')
-            low_audio = signal.filtfilt(b, a, audio[:min(len(audio), self.sample_rate * 30)])
+            kick_filter = self._kick_filters.get(sample_rate)
+            if kick_filter is None:
+                nyq = sample_rate / 2
+                low = 100 / nyq
+                sos = signal.butter(4, low, btype='low', output='sos')
+                # Passband group delay of the forward-only filter
+                _, delay = signal.group_delay(signal.sos2tf(sos), w=[np.pi * 50 / nyq])
+                kick_filter = (sos, int(round(delay[0])))
+                self._kick_filters[sample_rate] = kick_filter
+            sos, delay = kick_filter
+            low_audio = signal.sosfilt(sos, audio[:min(len(audio), int(sample_rate * 30))])
         except:
             return 0.0
         
-        # Get envelope
-        envelope = np.abs(low_audio)
+        # Get envelope, shifted back by the filter delay so beats stay aligned
+        envelope = np.abs(low_audio[delay:])
         
-        # Check for regular beats
-        beat_count = 0
-        total_beats = 0
+        # Check for regular beats: one row per whole beat
+        total_beats = len(range(0, len(envelope) - beat_samples, beat_samples))
+        if total_beats == 0:
+            return 0.0
         
-        for i in range(0, len(envelope) - beat_samples, beat_samples):
-            segment = envelope[i:i + beat_samples]
-            peak_pos = np.argmax(segment)
-            
-            # Check if peak is near the start of the beat (kick on downbeat)
-            if peak_pos < beat_samples * 0.2:  # Within first 20% of beat
-                beat_count += 1
-            total_beats += 1
-        
-        if total_beats > 0:
-            return float(beat_count / total_beats)
-        return 0.0
+        beats = envelope[:total_beats * beat_samples].reshape(total_beats, beat_samples)
+        peak_pos = np.argmax(beats, axis=1)
+        
+        # Check if peak is near the start of the beat (kick on downbeat)
+        beat_count = np.count_nonzero(peak_pos < beat_samples * 0.2)  # Within first 20% of beat
+        
+        return float(beat_count / total_beats)
     
     def _analyze_spectrum(self, audio: np.ndarray) -> Dict:
         """Analyze frequency spectrum distribution."""
@@ -275,18 +492,11 @@ class GenreDetector:
         segment_length = min(len(audio), self.sample_rate * 30)
         segment = audio[:segment_length]
         
-        n_fft = 4096
-        freqs = fftfreq(n_fft, 1/self.sample_rate)[:n_fft//2]
-        
+        n_fft = self.SPECTRUM_N_FFT
         hop = n_fft // 2
-        spectra = []
+        n_frames = len(range(0, len(segment) - n_fft, hop))
         
-        for i in range(0, len(segment) - n_fft, hop):
-            chunk = segment[i:i+n_fft]
-            spec = np.abs(fft(chunk * np.hanning(n_fft)))[:n_fft//2]
-            spectra.append(spec)
-        
-        if not spectra:
+        if n_frames == 0:
             return {
                 'sub_bass_ratio': 0.0,
                 'bass_ratio': 0.0,
@@ -297,16 +507,27 @@ class GenreDetector:
                 'presence_ratio': 0.0
             }
         
-        avg_spectrum = np.mean(spectra, axis=0)
-        total_energy = np.sum(avg_spectrum) + 1e-10
+        # Batched real FFTs over blocks of windowed frames, keeping only the
+        # per-bin magnitude sums; the windowed block is a temporary, so the
+        # FFT may reuse its buffer
+        frames = sliding_window_view(segment, n_fft)[::hop][:n_frames]
+        window = self.SPECTRUM_WINDOW
+        block = self.SPECTRUM_BLOCK_FRAMES
+        spectrum_sum = np.zeros(n_fft // 2 + 1)
+        
+        for start in range(0, n_frames, block):
+            windowed = frames[start:start + block] * window
+            spectrum_sum += np.abs(rfft(windowed, axis=1, overwrite_x=True)).sum(axis=0)
         
-        # Frequency bands
-        sub_bass = np.sum(avg_spectrum[(freqs >= 20) & (freqs < 60)])
-        bass = np.sum(avg_spectrum[(freqs >= 60) & (freqs < 250)])
-        low_mid = np.sum(avg_spectrum[(freqs >= 250) & (freqs < 500)])
-        mid = np.sum(avg_spectrum[(freqs >= 500) & (freqs < 2000)])
-        high_mid = np.sum(avg_spectrum[(freqs >= 2000) & (freqs < 6000)])
-        high = np.sum(avg_spectrum[(freqs >= 6000) & (freqs < 20000)])
+        # Average, then drop the Nyquist bin
+        avg_spectrum = spectrum_sum[:n_fft//2] / n_frames
+        
+        # Frequency bands: differences of one running sum at the band edges
+        cumulative = np.concatenate(([0.0], np.cumsum(avg_spectrum)))
+        total_energy = cumulative[-1] + 1e-10
+        sub_bass, bass, low_mid, mid, high_mid, high = np.diff(
+            cumulative[self._spectrum_band_bins()]
+        )
         
         return {
             'sub_bass_ratio': float(sub_bass / total_energy),
@@ -318,22 +539,46 @@ class GenreDetector:
             'presence_ratio': float(high_mid / total_energy)
         }
     
+    def _spectrum_band_bins(self) -> np.ndarray:
+        """Bin index of each spectrum band edge for the current sample rate."""
+        
+        if self._band_bins_rate != self.sample_rate:
+            n_fft = self.SPECTRUM_N_FFT
+            freqs = rfftfreq(n_fft, 1/self.sample_rate)[:n_fft//2]
+            self._band_bins = np.searchsorted(freqs, self.SPECTRUM_BAND_EDGES)
+            self._band_bins_rate = self.sample_rate
+        
+        return self._band_bins
+    
     def _analyze_dynamics(self, audio: np.ndarray) -> Dict:
         """Analyze dynamic characteristics."""
         
-        rms = np.sqrt(np.mean(audio ** 2))
+        abs_audio = np.abs(audio)
+        n = len(abs_audio)
+        
+        rms = np.sqrt(np.dot(audio, audio) / n)
         rms_db = 20 * np.log10(rms + 1e-10)
         
-        peak = np.max(np.abs(audio))
+        peak = np.max(abs_audio)
         peak_db = 20 * np.log10(peak + 1e-10)
         
         crest_factor = peak / (rms + 1e-10)
         crest_factor_db = peak_db - rms_db
         
-        abs_audio = np.abs(audio)
-        loud_threshold = np.percentile(abs_audio, 95)
-        quiet_threshold = np.percentile(abs_audio[abs_audio > 0], 10)
-        dynamic_range = 20 * np.log10(loud_threshold / (quiet_threshold + 1e-10))
+        # 95th percentile of all samples and 10th percentile of the non-silent
+        # ones, read from a single partial sort (silent samples sort first)
+        n_silent = n - np.count_nonzero(abs_audio)
+        if n_silent < n:
+            positions = np.array([0.95 * (n - 1), n_silent + 0.10 * (n - n_silent - 1)])
+            below = np.floor(positions).astype(int)
+            above = np.ceil(positions).astype(int)
+            ordered = np.partition(abs_audio, np.union1d(below, above))
+            loud_threshold, quiet_threshold = (
+                ordered[below] + (ordered[above] - ordered[below]) * (positions - below)
+            )
+            dynamic_range = 20 * np.log10(loud_threshold / (quiet_threshold + 1e-10))
+        else:
+            dynamic_range = 0.0
         
         return {
             'rms_db': float(rms_db),
@@ -347,20 +592,17 @@ class GenreDetector:
         """Detect transient density (percussiveness)."""
         
         hop = 512
-        envelope = []
         
-        for i in range(1, len(audio) // hop - 1):
-            curr = np.sum(np.abs(audio[i*hop:(i+1)*hop]))
-            prev = np.sum(np.abs(audio[(i-1)*hop:i*hop]))
-            diff = max(0, curr - prev)
-            envelope.append(diff)
-        
-        if not envelope:
+        # Per-hop energies of every hop but the last, then their rises
+        n_hops = len(audio) // hop - 1
+        if n_hops < 2:
             return 0.5
         
-        envelope = np.array(envelope)
+        hop_energy = np.abs(audio[:n_hops * hop]).reshape(n_hops, hop).sum(axis=1)
+        envelope = np.maximum(np.diff(hop_energy), 0)
+        
         threshold = np.mean(envelope) + np.std(envelope)
-        transients = np.sum(envelope > threshold)
+        transients = np.count_nonzero(envelope > threshold)
         
         duration_seconds = len(audio) / self.sample_rate
         transients_per_second = transients / duration_seconds
@@ -371,209 +613,24 @@ class GenreDetector:
         """Calculate genre probability scores based on analysis."""
         
         tempo = analysis['tempo']
-        scores = {}
-        
-        logger.info(f"  Scoring with tempo={tempo:.1f}, bass={analysis['bass_ratio']:.2f}, mid={analysis['mid_ratio']:.2f}")
-        
-        # =====================================================================
-        # HOUSE / AFRO HOUSE (118-130 BPM) - TEMPO IS KING
-        # =====================================================================
-        house_score = 0.0
-        
-        # Tempo is VERY important for house - 50% weight
-        if 120 <= tempo <= 128:
-            house_score += 0.50  # Perfect house tempo
-        elif 118 <= tempo <= 130:
-            house_score += 0.40  # Good house tempo
-        elif 115 <= tempo <= 133:
-            house_score += 0.25  # Acceptable
-        
-        # Bass presence (house has groovy bass)
-        if analysis['bass_ratio'] > 0.15:
-            house_score += 0.20
-        
-        # Not too mid-heavy (unlike rock)
-        if analysis['mid_ratio'] < 0.45:
-            house_score += 0.15
-        
-        # Percussive
-        if analysis['transient_density'] > 0.25:
-            house_score += 0.10
-        
-        # Bonus for four-on-floor if detected
-        if analysis.get('four_on_floor_score', 0) > 0.4:
-            house_score += 0.15
-        
-        scores['house'] = house_score
-        
-        # =====================================================================
-        # TECHNO / TECH HOUSE (125-145 BPM)
-        # =====================================================================
-        techno_score = 0.0
-        
-        if 128 <= tempo <= 140:
-            techno_score += 0.45
-        elif 125 <= tempo <= 145:
-            techno_score += 0.35
-        
-        if analysis['bass_ratio'] > 0.18:
-            techno_score += 0.20
-        
-        if analysis['mid_ratio'] < 0.40:
-            techno_score += 0.15
-        
-        if analysis.get('four_on_floor_score', 0) > 0.4:
-            techno_score += 0.15
-        
-        scores['techno'] = techno_score
-        
-        # =====================================================================
-        # EDM / ELECTRONIC (128-160 BPM, high energy)
-        # =====================================================================
-        edm_score = 0.0
-        
-        if 128 <= tempo <= 150:
-            edm_score += 0.40
-        elif 125 <= tempo <= 160:
-            edm_score += 0.30
-        
-        if analysis['bass_ratio'] > 0.20:
-            edm_score += 0.20
-        
-        # EDM often compressed
-        if analysis['crest_factor'] < 6:
-            edm_score += 0.15
-        
-        if analysis['high_ratio'] > 0.10:
-            edm_score += 0.15
-        
-        scores['edm'] = edm_score
-        
-        # =====================================================================
-        # HIP-HOP (70-100 BPM, heavy sub-bass)
-        # =====================================================================
-        hiphop_score = 0.0
-        
-        if 75 <= tempo <= 95:
-            hiphop_score += 0.45
-        elif 70 <= tempo <= 100:
-            hiphop_score += 0.35
-        elif 65 <= tempo <= 110:
-            hiphop_score += 0.15
-        
-        # Heavy sub-bass
-        if analysis['sub_bass_ratio'] > 0.06:
-            hiphop_score += 0.25
-        
-        if analysis['bass_ratio'] > 0.25:
-            hiphop_score += 0.15
-        
-        scores['hiphop'] = hiphop_score
-        
-        # =====================================================================
-        # POP (100-125 BPM, balanced)
-        # =====================================================================
-        pop_score = 0.0
-        
-        if 100 <= tempo <= 125:
-            pop_score += 0.30
-        
-        # Balanced spectrum
-        if 0.12 < analysis['bass_ratio'] < 0.28:
-            pop_score += 0.20
-        
-        if 0.25 < analysis['mid_ratio'] < 0.45:
-            pop_score += 0.15
-        
-        if analysis['brightness'] > 0.4:
-            pop_score += 0.15
-        
-        # Vocal presence
-        if analysis['presence_ratio'] > 0.08:
-            pop_score += 0.15
-        
-        scores['pop'] = pop_score
-        
-        # =====================================================================
-        # ROCK (100-145 BPM, mid-heavy, VERY dynamic)
-        # =====================================================================
-        rock_score = 0.0
-        
-        # Tempo contributes less for rock
-        if 100 <= tempo <= 145:
-            rock_score += 0.10
-        
-        # Rock is MID-HEAVY (guitars) - key differentiator
-        if analysis['mid_ratio'] > 0.50:
-            rock_score += 0.30
-        elif analysis['mid_ratio'] > 0.45:
-            rock_score += 0.15
-        
-        # Rock is VERY dynamic (crest factor > 6)
-        if analysis['crest_factor'] > 7:
-            rock_score += 0.25
-        elif analysis['crest_factor'] > 5:
-            rock_score += 0.10
-        
-        # High dynamic range
-        if analysis['dynamic_range_db'] > 18:
-            rock_score += 0.20
-        elif analysis['dynamic_range_db'] > 14:
-            rock_score += 0.10
-        
-        # Low sub-bass (acoustic instruments)
-        if analysis['sub_bass_ratio'] < 0.04:
-            rock_score += 0.15
-        
-        scores['rock'] = rock_score
-        
-        # =====================================================================
-        # R&B / SOUL (60-95 BPM, warm, smooth)
-        # =====================================================================
-        rnb_score = 0.0
-        
-        if 65 <= tempo <= 95:
-            rnb_score += 0.40
-        elif 60 <= tempo <= 100:
-            rnb_score += 0.25
-        
-        if 0.15 < analysis['bass_ratio'] < 0.28:
-            rnb_score += 0.20
-        
-        if analysis['brightness'] < 0.6:
-            rnb_score += 0.15
-        
-        if analysis['presence_ratio'] > 0.08:
-            rnb_score += 0.15
-        
-        scores['rnb'] = rnb_score
-        
-        # =====================================================================
-        # ACOUSTIC (natural dynamics, mid-focused)
-        # =====================================================================
-        acoustic_score = 0.0
-        
-        # Very high dynamic range
-        if analysis['dynamic_range_db'] > 20:
-            acoustic_score += 0.35
-        elif analysis['dynamic_range_db'] > 16:
-            acoustic_score += 0.20
-        
-        # Very high crest factor
-        if analysis['crest_factor'] > 8:
-            acoustic_score += 0.30
-        elif analysis['crest_factor'] > 6:
-            acoustic_score += 0.15
-        
-        # Low bass
-        if analysis['sub_bass_ratio'] < 0.03:
-            acoustic_score += 0.20
-        
-        # Low transients (less percussive)
-        if analysis['transient_density'] < 0.25:
-            acoustic_score += 0.15
         
-        scores['acoustic'] = acoustic_score
+        logger.info(f"  Scoring with tempo={tempo:.1f}, bass={analysis.get('bass_ratio', np.nan):.2f}, mid={analysis.get('mid_ratio', np.nan):.2f}")
+        
+        # Evaluate every tier at once, keep the best tier per rule, then add
+        # the rules of each genre (features that were not analysed are NaN and
+        # match no tier)
+        values = np.array([analysis.get(f, np.nan) for f in self._rule_features])[self._tier_feature]
+        inside = np.where(
+            self._tier_inclusive,
+            (values >= self._tier_low) & (values <= self._tier_high),
+            (values > self._tier_low) & (values < self._tier_high)
+        )
+        tier_scores = np.where(inside, self._tier_weight, 0.0)
+        rule_scores = np.maximum.reduceat(tier_scores, self._rule_starts)
+        genre_scores = np.bincount(
+            self._rule_genre, weights=rule_scores, minlength=len(self.GENRE_RULES)
+        )
+        scores = {genre: float(score) for genre, score in zip(self.GENRE_RULES, genre_scores)}
         
         # =====================================================================
         # Log all scores before normalization
@@ -4,9 +4,12 @@ Uses pre-trained models for accurate music genre classification
 """
 
 import numpy as np
+import math
 import os
+import threading
 import urllib.request
 import logging
+from numpy.lib.stride_tricks import sliding_window_view
 from typing import Dict, Optional, List
 from pathlib import Path
 
@@ -19,6 +22,13 @@ MODEL_FILES = {
     "model": "discogs-effnet-bs64-1.pb",
 }
 
+# INT8 embedding model for onnxruntime, produced once by quantize_embedding_model().
+# Only used with AIGenreDetector(use_quantized_model=True): its agreement with
+# the FP32 graph has not been measured yet
+QUANTIZED_MODEL_FILE = "discogs-effnet-bs64-1-int8.onnx"
+
+DEFAULT_MODELS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "ml_models", "genre")
+
 # Genre classification head URL (used with embeddings from above)
 GENRE_HEAD_URL = "https://essentia.upf.edu/models/classification-heads/genre_discogs400/"
 GENRE_HEAD_FILES = {
@@ -26,6 +36,28 @@ GENRE_HEAD_FILES = {
     "metadata": "genre_discogs400-discogs-effnet-1.json"
 }
 
+# Loaded (embedding model, classification head, labels, label genres, inference
+# lock), shared by every detector and keyed by (model directory, use INT8 model)
+_LOADED_MODELS = {}
+_LOADED_MODELS_LOCK = threading.Lock()
+
+# Essentia algorithm instances keep per-call state, so a loaded model set is
+# driven by one thread at a time; a detection that cannot get its turn within
+# _INFERENCE_TIMEOUT seconds gives up and falls back to analysis
+_INFERENCE_TIMEOUT = 120.0
+
+
+def _predict_genres(embedding_model, genre_head, lock, audio: np.ndarray) -> np.ndarray:
+    """Genre activations per patch of 16 kHz mono audio."""
+    if not lock.acquire(timeout=_INFERENCE_TIMEOUT):
+        raise TimeoutError(f"Genre model busy for more than {_INFERENCE_TIMEOUT:.0f}s")
+    try:
+        embeddings = embedding_model(audio)
+        return genre_head(embeddings)
+    finally:
+        lock.release()
+
+
 # Mapping from Discogs genres to our simplified genres
 GENRE_MAPPING = {
     # Electronic / Dance
@@ -73,7 +105,6 @@ GENRE_MAPPING = {
     
     # Pop
     "pop": "pop",
-    "synth-pop": "pop",
     "dance-pop": "pop",
     "indie pop": "pop",
     "britpop": "pop",
@@ -130,6 +161,98 @@ GENRE_MAPPING = {
     "other": "pop"
 }
 
+# Simplified genres, indexed by the per-label lookup table built at model load
+SIMPLE_GENRES = ['house', 'techno', 'edm', 'hiphop', 'pop', 'rock', 'rnb', 'acoustic']
+
+
+class _QuantizedEffnet:
+    """
+    INT8 EffNet embedding model on onnxruntime.
+    Called like TensorflowPredictEffnetDiscogs: 16 kHz mono audio in,
+    one embedding per patch out.
+    """
+    
+    # Patching and batch size of the Discogs EffNet graph
+    PATCH_SIZE = 128
+    PATCH_HOP = 62
+    BATCH_SIZE = 64
+    
+    def __init__(self, model_path: str):
+        import onnxruntime as ort
+        from essentia.standard import TensorflowInputMusiCNN
+        
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = os.cpu_count() or 1
+        self.session = ort.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        
+        # Same mel bands the Essentia wrapper feeds the graph
+        self.melbands = TensorflowInputMusiCNN()
+    
+    def __call__(self, audio: np.ndarray) -> np.ndarray:
+        from essentia.standard import FrameGenerator
+        
+        bands = np.array([
+            self.melbands(frame)
+            for frame in FrameGenerator(audio, frameSize=512, hopSize=256, startFromZero=True)
+        ], dtype=np.float32).reshape(-1, 96)
+        
+        # Clips shorter than one patch are zero-padded to it
+        if len(bands) < self.PATCH_SIZE:
+            bands = np.pad(bands, ((0, self.PATCH_SIZE - len(bands)), (0, 0)))
+        
+        patches = sliding_window_view(bands, self.PATCH_SIZE, axis=0)[::self.PATCH_HOP]
+        patches = patches.swapaxes(1, 2)
+        
+        # The graph has a fixed batch size; pad the last batch and drop the padding
+        embeddings = []
+        for start in range(0, len(patches), self.BATCH_SIZE):
+            batch = patches[start:start + self.BATCH_SIZE]
+            n = len(batch)
+            if n < self.BATCH_SIZE:
+                batch = np.concatenate([
+                    batch, np.zeros((self.BATCH_SIZE - n,) + batch.shape[1:], np.float32)
+                ])
+            output = self.session.run(None, {self.input_name: np.ascontiguousarray(batch)})[0]
+            embeddings.append(output[:n])
+        
+        return np.concatenate(embeddings)
+
+
+def quantize_embedding_model(models_dir: Optional[str] = None) -> Path:
+    """
+    One-time offline step: convert the EffNet graph to ONNX and quantize its
+    weights to INT8. Needs tensorflow and tf2onnx, which the service does not.
+    
+    Args:
+        models_dir: Directory holding the downloaded EffNet graph
+        
+    Returns:
+        Path of the quantized model, used by AIGenreDetector(use_quantized_model=True)
+    """
+    import subprocess
+    import sys
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    
+    models_dir = Path(models_dir or DEFAULT_MODELS_DIR)
+    graph_path = models_dir / MODEL_FILES["model"]
+    fp32_path = models_dir / "discogs-effnet-bs64-1.onnx"
+    quantized_path = models_dir / QUANTIZED_MODEL_FILE
+    
+    subprocess.run([
+        sys.executable, "-m", "tf2onnx.convert",
+        "--graphdef", str(graph_path),
+        "--inputs", "serving_default_melspectrogram:0",
+        "--outputs", "PartitionedCall:1",
+        "--output", str(fp32_path),
+    ], check=True)
+    
+    quantize_dynamic(str(fp32_path), str(quantized_path), weight_type=QuantType.QInt8)
+    logger.info(f"Quantized embedding model written to {quantized_path}")
+    return quantized_path
+
 
 class AIGenreDetector:
     """
@@ -137,15 +260,33 @@ class AIGenreDetector:
     Uses the Discogs-EffNet model trained on 400+ genre labels.
     """
     
-    def __init__(self, sample_rate: int = 48000, models_dir: Optional[str] = None):
+    def __init__(
+        self,
+        sample_rate: int = 48000,
+        models_dir: Optional[str] = None,
+        use_quantized_model: bool = False
+    ):
+        """
+        Args:
+            sample_rate: Audio sample rate
+            models_dir: Directory for the downloaded models
+            use_quantized_model: Use the INT8 embedding model from
+                                 quantize_embedding_model() if it exists
+                                 (experimental, off by default)
+        """
         self.sample_rate = sample_rate
-        self.models_dir = Path(models_dir or os.path.join(os.path.dirname(__file__), "..", "..", "ml_models", "genre"))
+        self.models_dir = Path(models_dir or DEFAULT_MODELS_DIR)
+        self.use_quantized_model = use_quantized_model
         self.models_dir.mkdir(parents=True, exist_ok=True)
         
         self.model = None
         self.labels = None
+        self.label_genres = np.empty(0, dtype=np.int8)
         self._model_loaded = False
         
+        # Anti-aliasing FIR for the 16 kHz resampler, keyed by (up, down)
+        self._resample_filters = {}
+        
     def _ensure_models_downloaded(self):
         """Download both embedding model and classification head if not present."""
         # Download embedding model
@@ -189,38 +330,78 @@ class AIGenreDetector:
         if self._model_loaded:
             return True
             
+        key = (str(self.models_dir.resolve()), self.use_quantized_model)
+        loaded = _LOADED_MODELS.get(key)
+        if loaded is not None:
+            (self.embedding_model, self.genre_head, self.labels,
+             self.label_genres, self._inference_lock) = loaded
+            self._model_loaded = True
+            return True
+        
         try:
             from essentia.standard import TensorflowPredictEffnetDiscogs, TensorflowPredict2D
             
-            if not self._ensure_models_downloaded():
-                return False
-            
-            embedding_path = str(self.models_dir / MODEL_FILES["model"])
-            head_path = str(self.models_dir / GENRE_HEAD_FILES["model"])
-            
-            # Load embedding model (processes raw audio -> embeddings)
-            self.embedding_model = TensorflowPredictEffnetDiscogs(
-                graphFilename=embedding_path,
-                output="PartitionedCall:1"  # Embeddings output
-            )
-            logger.info("Loaded EffNet embedding model")
-            
-            # Load classification head (embeddings -> genre probabilities)
-            self.genre_head = TensorflowPredict2D(
-                graphFilename=head_path,
-                input="serving_default_model_Placeholder",
-                output="PartitionedCall:0"
-            )
-            logger.info("Loaded genre classification head")
-            
-            # Load metadata (labels)
-            metadata_path = self.models_dir / GENRE_HEAD_FILES["metadata"]
-            if metadata_path.exists():
-                import json
-                with open(metadata_path, 'r') as f:
-                    metadata = json.load(f)
-                    self.labels = metadata.get('classes', [])
-                    logger.info(f"Loaded {len(self.labels)} genre labels")
+            with _LOADED_MODELS_LOCK:
+                # Another detector may have loaded it while we waited
+                loaded = _LOADED_MODELS.get(key)
+                if loaded is not None:
+                    (self.embedding_model, self.genre_head, self.labels,
+                     self.label_genres, self._inference_lock) = loaded
+                    self._model_loaded = True
+                    return True
+                
+                if not self._ensure_models_downloaded():
+                    return False
+                
+                embedding_path = str(self.models_dir / MODEL_FILES["model"])
+                quantized_path = self.models_dir / QUANTIZED_MODEL_FILE
+                head_path = str(self.models_dir / GENRE_HEAD_FILES["model"])
+                
+                # Load embedding model (processes raw audio -> embeddings),
+                # the INT8 build only when asked for and generated
+                self.embedding_model = None
+                if self.use_quantized_model and quantized_path.exists():
+                    try:
+                        self.embedding_model = _QuantizedEffnet(str(quantized_path))
+                        logger.info("Loaded INT8 EffNet embedding model")
+                    except Exception as e:
+                        logger.warning(f"Could not load INT8 embedding model: {e}, using FP32")
+                
+                if self.embedding_model is None:
+                    self.embedding_model = TensorflowPredictEffnetDiscogs(
+                        graphFilename=embedding_path,
+                        output="PartitionedCall:1"  # Embeddings output
+                    )
+                    logger.info("Loaded EffNet embedding model")
+                
+                # Load classification head (embeddings -> genre probabilities)
+                self.genre_head = TensorflowPredict2D(
+                    graphFilename=head_path,
+                    input="serving_default_model_Placeholder",
+                    output="PartitionedCall:0"
+                )
+                logger.info("Loaded genre classification head")
+                
+                # Load metadata (labels)
+                metadata_path = self.models_dir / GENRE_HEAD_FILES["metadata"]
+                if metadata_path.exists():
+                    import json
+                    with open(metadata_path, 'r') as f:
+                        metadata = json.load(f)
+                        self.labels = metadata.get('classes', [])
+                        logger.info(f"Loaded {len(self.labels)} genre labels")
+                
+                # Simplified genre of every model output, as an index into SIMPLE_GENRES
+                self.label_genres = np.array(
+                    [SIMPLE_GENRES.index(self._map_to_simple_genre(label)) for label in self.labels or []],
+                    dtype=np.int8
+                )
+                
+                self._inference_lock = threading.Lock()
+                _LOADED_MODELS[key] = (
+                    self.embedding_model, self.genre_head, self.labels, self.label_genres,
+                    self._inference_lock
+                )
             
             self._model_loaded = True
             logger.info("Genre classification pipeline loaded successfully")
@@ -247,29 +428,42 @@ class AIGenreDetector:
         """
         logger.info("Starting AI genre detection...")
         
-        # Convert to mono float32
-        if audio.ndim > 1:
-            mono = np.mean(audio, axis=0).astype(np.float32)
-        else:
-            mono = audio.astype(np.float32)
-        
         # MEMORY OPTIMIZATION: Only analyze first 10 seconds
-        # This is enough to detect genre and saves RAM
+        # This is enough to detect genre and saves RAM. Trimming before the
+        # downmix means only those 10 seconds are ever copied.
         max_samples = int(self.sample_rate * 10)  # 10 seconds
-        if len(mono) > max_samples:
-            mono = mono[:max_samples]
+        if audio.shape[-1] > max_samples:
+            audio = audio[..., :max_samples]
             logger.info(f"Trimmed audio to 10 seconds for genre detection")
         
-        # Normalize to [-1, 1]
-        if np.max(np.abs(mono)) > 0:
-            mono = mono / np.max(np.abs(mono))
+        # Convert to mono float32 (always a fresh array, safe to modify)
+        if audio.ndim > 1:
+            mono = np.mean(audio, axis=0, dtype=np.float32)
+        else:
+            mono = audio.astype(np.float32)
+        
+        # Normalize to [-1, 1] in place
+        peak = max(mono.max(), -mono.min()) if len(mono) else 0
+        if peak > 0:
+            np.multiply(mono, 1.0 / peak, out=mono)
         
         # Resample to 16kHz if needed (Essentia models expect 16kHz)
         if self.sample_rate != 16000:
             try:
                 from scipy import signal
-                num_samples = int(len(mono) * 16000 / self.sample_rate)
-                mono = signal.resample(mono, num_samples)
+                g = math.gcd(16000, int(self.sample_rate))
+                up, down = 16000 // g, int(self.sample_rate) // g
+                
+                # Same Kaiser FIR resample_poly would design, built once per ratio
+                fir = self._resample_filters.get((up, down))
+                if fir is None:
+                    max_rate = max(up, down)
+                    fir = signal.firwin(
+                        2 * 10 * max_rate + 1, 1. / max_rate, window=('kaiser', 5.0)
+                    ).astype(np.float32)
+                    self._resample_filters[(up, down)] = fir
+                
+                mono = signal.resample_poly(mono, up, down, window=fir)
             except:
                 pass
         
@@ -288,12 +482,10 @@ class AIGenreDetector:
     def _detect_with_ai(self, audio: np.ndarray) -> Optional[Dict]:
         """Detect genre using the two-stage EffNet pipeline."""
         try:
-            # Stage 1: Get embeddings from EffNet model
-            embeddings = self.embedding_model(audio)
-            logger.info(f"Got embeddings with shape: {embeddings.shape}")
-            
-            # Stage 2: Pass embeddings through classification head
-            predictions = self.genre_head(embeddings)
+            # EffNet embeddings, then the classification head
+            predictions = _predict_genres(
+                self.embedding_model, self.genre_head, self._inference_lock, audio
+            )
             print(f"[AI] Got predictions with shape: {predictions.shape}")
             
             # Average across time frames if multiple
@@ -323,7 +515,10 @@ class AIGenreDetector:
                 all_scores = {"electronic": float(top_scores[0])}
             
             # Map to our simplified genres
-            detected_genre = self._map_to_simple_genre(top_label.lower())
+            if top_indices[0] < len(self.label_genres):
+                detected_genre = SIMPLE_GENRES[self.label_genres[top_indices[0]]]
+            else:
+                detected_genre = self._map_to_simple_genre(top_label.lower())
             confidence = float(top_scores[0]) if len(top_scores) > 0 else 0.5
             
             print(f"[AI] Detected: '{top_label}' -> '{detected_genre}' with confidence {confidence:.2%}")
@@ -331,6 +526,16 @@ class AIGenreDetector:
             result = self._format_result(detected_genre, confidence, "ai_effnet")
             result['raw_label'] = top_label
             result['all_scores'] = all_scores
+            
+            # Activation mass per simplified genre
+            n_labels = min(len(self.label_genres), len(avg_predictions))
+            if n_labels > 0:
+                distribution = np.bincount(
+                    self.label_genres[:n_labels],
+                    weights=avg_predictions[:n_labels],
+                    minlength=len(SIMPLE_GENRES)
+                )
+                result['analysis']['genre_distribution'] = dict(zip(SIMPLE_GENRES, distribution.tolist()))
             return result
             
         except Exception as e:
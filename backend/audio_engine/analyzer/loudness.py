@@ -5,15 +5,93 @@ Measures LUFS, LRA, True Peak, and Crest Factor
 
 import numpy as np
 import pyloudnorm as pyln
-from typing import Dict
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import signal
+from typing import Dict, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# ITU-R BS.1770 channel weights (L, R, C, Ls, Rs)
+CHANNEL_GAINS = np.array([1.0, 1.0, 1.0, 1.41, 1.41])
+
+# Gating blocks of ITU-R BS.1770: 400ms with 75% overlap
+GATING_BLOCK_DURATION = 0.4
+GATING_BLOCK_STEP = 0.25
+
+
+def k_weighting_sos(meter: pyln.Meter) -> np.ndarray:
+    """
+    K-weighting filter of a pyloudnorm meter (pre-filter and RLB high-pass)
+    as second-order sections
+    
+    Args:
+        meter: pyloudnorm meter for the sample rate
+        
+    Returns:
+        SOS array, with the passband gains folded into the first section
+    """
+    stages = list(meter._filters.values())
+    sos = np.array([np.concatenate((stage.b, stage.a)) / stage.a[0] for stage in stages])
+    sos[0, :3] *= np.prod([stage.passband_gain for stage in stages])
+    return sos
+
+
+def gating_block_edges(n_samples: int, sample_rate: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sample range of each gating block, as pyloudnorm counts them
+    
+    Args:
+        n_samples: Signal length in samples (at least one block)
+        sample_rate: Sample rate
+        
+    Returns:
+        Tuple of (first sample, end sample) arrays, one entry per block
+    """
+    duration = n_samples / sample_rate
+    n_blocks = int(np.round(
+        (duration - GATING_BLOCK_DURATION) / (GATING_BLOCK_DURATION * GATING_BLOCK_STEP)
+    )) + 1
+    j = np.arange(n_blocks)
+    lower = (GATING_BLOCK_DURATION * (j * GATING_BLOCK_STEP) * sample_rate).astype(int)
+    upper = (GATING_BLOCK_DURATION * (j * GATING_BLOCK_STEP + 1) * sample_rate).astype(int)
+    
+    # n_blocks is rounded, so the last block can run past the end of the
+    # signal; like pyloudnorm's slice, it then covers only what is left
+    return lower, np.minimum(upper, n_samples)
+
+
+def gated_loudness(block_power: np.ndarray) -> float:
+    """
+    Integrated loudness from the mean square of each gating block
+    
+    Args:
+        block_power: K-weighted power of each block divided by the full
+            block length (see gating_block_edges)
+        
+    Returns:
+        Integrated loudness in LUFS
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        block_loudness = -0.691 + 10 * np.log10(block_power)
+        
+        # Absolute gate at -70 LUFS, then relative gate 10 LU below
+        # the level of the remaining blocks
+        gated = block_loudness >= -70
+        relative_gate = -0.691 + 10 * np.log10(block_power[gated].sum() / gated.sum()) - 10
+        gated = (block_loudness > relative_gate) & (block_loudness > -70)
+        gated_power = np.nan_to_num(block_power[gated].sum() / gated.sum())
+        
+        return -0.691 + 10 * np.log10(gated_power)
+
 
 class LoudnessAnalyzer:
     """Loudness analysis for audio signals"""
     
+    # Metrics from analyze() that a plain gain shifts by exactly its dB
+    # value (the rest, e.g. LRA and crest factor, are gain-independent)
+    LEVEL_METRICS = ('lufs_integrated', 'true_peak_dbTP', 'peak_dbFS', 'rms_dbFS')
+    
     def __init__(self, sample_rate: int = 48000):
         """
         Initialize loudness analyzer
@@ -24,6 +102,14 @@ class LoudnessAnalyzer:
         self.sample_rate = sample_rate
         self.meter = pyln.Meter(sample_rate)
         
+        # K-weighting as one SOS cascade, rebuilt if sample_rate changes
+        self._k_sos = None
+        self._k_sos_rate = None
+        
+        # 4x oversampling interpolation filter for true peak, as designed by
+        # resample_poly (Kaiser-windowed sinc, 10 input samples each side)
+        self._true_peak_fir = signal.firwin(2 * 10 * 4 + 1, 1. / 4, window=('kaiser', 5.0))
+        
     def analyze(self, audio: np.ndarray) -> Dict:
         """
         Perform loudness analysis on audio
@@ -45,9 +131,16 @@ class LoudnessAnalyzer:
         
         metrics = {}
         
+        # K-weighted power, shared by the LUFS and LRA measurements
+        try:
+            power = self._k_weighted_power(audio_t)
+        except Exception as e:
+            logger.warning(f"Could not K-weight audio: {e}")
+            power = None
+        
         # Integrated loudness (LUFS)
         try:
-            loudness = self.meter.integrated_loudness(audio_t)
+            loudness = self._integrated_loudness(power)
             metrics['lufs_integrated'] = float(loudness)
         except Exception as e:
             logger.warning(f"Could not measure LUFS: {e}")
@@ -55,7 +148,7 @@ class LoudnessAnalyzer:
         
         # Loudness range (LRA)
         try:
-            lra = self._calculate_lra(audio_t)
+            lra = self._calculate_lra(power)
             metrics['lra'] = float(lra)
         except Exception as e:
             logger.warning(f"Could not measure LRA: {e}")
@@ -65,12 +158,16 @@ class LoudnessAnalyzer:
         true_peak = self._calculate_true_peak(audio)
         metrics['true_peak_dbTP'] = float(true_peak)
         
+        # Peak and RMS from the raw samples, without full-size |x| or x**2
+        # temporaries (the dot product squares and sums in one pass)
+        samples = audio.ravel()
+        
         # Peak level
-        peak = np.max(np.abs(audio))
+        peak = max(samples.max(), -samples.min())
         metrics['peak_dbFS'] = float(20 * np.log10(peak + 1e-10))
         
         # RMS level
-        rms = np.sqrt(np.mean(audio ** 2))
+        rms = np.sqrt(np.dot(samples, samples) / samples.size)
         metrics['rms_dbFS'] = float(20 * np.log10(rms + 1e-10))
         
         # Crest factor
@@ -86,12 +183,33 @@ class LoudnessAnalyzer:
         
         return metrics
     
-    def _calculate_lra(self, audio: np.ndarray) -> float:
+    def _integrated_loudness(self, power: np.ndarray) -> float:
+        """
+        Integrated gated loudness (ITU-R BS.1770-4), as pyloudnorm measures it
+        
+        Args:
+            power: K-weighted power from _k_weighted_power
+            
+        Returns:
+            Integrated loudness in LUFS
+        """
+        block_length = GATING_BLOCK_DURATION * self.sample_rate
+        if len(power) < block_length:
+            raise ValueError("Audio must have length greater than the block size.")
+        
+        # Mean square of each block from a running sum of the power
+        lower, upper = gating_block_edges(len(power), self.sample_rate)
+        cumulative = np.concatenate(([0.0], np.cumsum(power)))
+        block_power = (cumulative[upper] - cumulative[lower]) / block_length
+        
+        return gated_loudness(block_power)
+    
+    def _calculate_lra(self, power: np.ndarray) -> float:
         """
         Calculate Loudness Range (LRA)
         
         Args:
-            audio: Audio signal (samples x channels)
+            power: K-weighted power from _k_weighted_power
             
         Returns:
             LRA in LU
@@ -99,27 +217,69 @@ class LoudnessAnalyzer:
         # Use 3-second blocks
         block_size = int(3.0 * self.sample_rate)
         hop_size = int(0.1 * self.sample_rate)  # 100ms hop
+        hops_per_block = block_size // hop_size
+        
+        n_blocks = len(range(0, len(power) - block_size, hop_size))
+        if n_blocks < 2:
+            return 0.0
+        
+        # Power of each 100ms hop and of each 3s block as a sum of
+        # consecutive hops
+        n_hops = len(power) // hop_size
+        hop_power = power[:n_hops * hop_size].reshape(n_hops, hop_size).sum(axis=1)
+        block_power = sliding_window_view(hop_power, hops_per_block)[:n_blocks].sum(axis=1)
         
-        loudness_blocks = []
+        with np.errstate(divide='ignore'):
+            loudness_blocks = -0.691 + 10 * np.log10(block_power / (hops_per_block * hop_size))
         
-        for i in range(0, len(audio) - block_size, hop_size):
-            block = audio[i:i + block_size]
-            try:
-                block_loudness = self.meter.integrated_loudness(block)
-                if block_loudness > -70:  # Ignore very quiet blocks
-                    loudness_blocks.append(block_loudness)
-            except:
-                pass
+        # Absolute gate at -70 LUFS, then relative gate 20 LU below the
+        # level of the remaining blocks (EBU Tech 3342)
+        loudness_blocks = loudness_blocks[loudness_blocks > -70]
+        if len(loudness_blocks) < 2:
+            return 0.0
         
+        relative_gate = 10 * np.log10(np.mean(10 ** (loudness_blocks / 10))) - 20
+        loudness_blocks = loudness_blocks[loudness_blocks > relative_gate]
         if len(loudness_blocks) < 2:
             return 0.0
         
         # LRA is difference between 95th and 10th percentile
-        loudness_blocks = np.array(loudness_blocks)
-        lra = np.percentile(loudness_blocks, 95) - np.percentile(loudness_blocks, 10)
+        low, high = np.percentile(loudness_blocks, [10, 95])
+        lra = high - low
         
         return max(0.0, lra)
     
+    def _k_weighted_power(self, audio: np.ndarray) -> np.ndarray:
+        """
+        K-weighted, channel-weighted power of a signal (ITU-R BS.1770)
+        
+        Args:
+            audio: Audio signal (samples x channels)
+            
+        Returns:
+            Per-sample power summed over channels
+        """
+        if audio.ndim == 1:
+            audio = audio.reshape(-1, 1)
+        
+        filtered = signal.sosfilt(self._k_weighting_sos(), audio.astype(np.float64), axis=0)
+        
+        return np.square(filtered) @ CHANNEL_GAINS[:filtered.shape[1]]
+    
+    def _k_weighting_sos(self) -> np.ndarray:
+        """
+        K-weighting filter (pyloudnorm's pre-filter and RLB high-pass) as
+        second-order sections for the current sample rate
+        """
+        if self._k_sos_rate != self.sample_rate:
+            if self.meter.rate != self.sample_rate:
+                self.meter = pyln.Meter(self.sample_rate)
+            
+            self._k_sos = k_weighting_sos(self.meter)
+            self._k_sos_rate = self.sample_rate
+        
+        return self._k_sos
+    
     def _calculate_true_peak(self, audio: np.ndarray) -> float:
         """
         Calculate True Peak level
@@ -131,16 +291,22 @@ class LoudnessAnalyzer:
             True peak in dBTP
         """
         # Oversample by 4x for true peak detection
-        from scipy import signal
-        
         if audio.ndim == 1:
             audio = audio.reshape(1, -1)
         
         max_peak = 0.0
-        
-        for channel in audio:
-            # Upsample
-            upsampled = signal.resample(channel, len(channel) * 4)
+        chunk = self.sample_rate  # 1s of input per interpolation call
+        pad = 16  # Input samples of context, more than the filter half-length
+        n_samples = audio.shape[1]
+        
+        for start in range(0, n_samples, chunk):
+            # Upsample the chunk with some context on each side, keeping only
+            # the output for the chunk itself (identical to a whole-signal pass)
+            lo = max(start - pad, 0)
+            hi = min(start + chunk + pad, n_samples)
+            upsampled = signal.resample_poly(
+                audio[:, lo:hi], 4, 1, axis=1, window=self._true_peak_fir
+            )[:, 4 * (start - lo):4 * (min(start + chunk, n_samples) - lo)]
             
             # Find peak
             peak = np.max(np.abs(upsampled))
@@ -151,6 +317,23 @@ class LoudnessAnalyzer:
         
         return true_peak_dbTP
     
+    def apply_gain(self, metrics: Dict, gain_db: float) -> Dict:
+        """
+        Metrics of audio after a plain gain, without re-analyzing it
+        
+        Args:
+            metrics: Metrics from analyze() of the audio before the gain
+            gain_db: Gain applied to that audio
+            
+        Returns:
+            Metrics of the gained audio
+        """
+        adjusted = dict(metrics)
+        for key in self.LEVEL_METRICS:
+            adjusted[key] = metrics[key] + gain_db
+        
+        return adjusted
+    
     def normalize_to_lufs(
         self, 
         audio: np.ndarray, 
@@ -173,7 +356,7 @@ class LoudnessAnalyzer:
             audio_t = audio.T
         
         try:
-            current_lufs = self.meter.integrated_loudness(audio_t)
+            current_lufs = self._integrated_loudness(self._k_weighted_power(audio_t))
         except:
             logger.warning("Could not measure LUFS for normalization")
             return audio
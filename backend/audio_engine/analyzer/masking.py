@@ -4,7 +4,9 @@ Detects frequency conflicts between stems for intelligent mixing
 """
 
 import numpy as np
-import librosa
+import scipy.fft
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import get_window
 from typing import Dict, List, Tuple
 import logging
 
@@ -17,6 +19,9 @@ class MaskingAnalyzer:
     This allows stems to "communicate" and avoid frequency conflicts
     """
     
+    # STFT frames transformed per rfft call in _stft_magnitude
+    FRAME_BLOCK = 256
+    
     def __init__(
         self,
         sample_rate: int = 48000,
@@ -35,6 +40,14 @@ class MaskingAnalyzer:
         self.n_fft = n_fft
         self.hop_length = hop_length
         
+        # Periodic Hann window, as used by librosa.stft
+        self._window = get_window('hann', n_fft).astype(np.float32)
+        
+        # STFT bin range per frequency band, built lazily for the current
+        # sample rate
+        self._band_slices = {}
+        self._band_slices_rate = None
+        
         # Critical frequency bands for masking detection
         self.critical_bands = {
             'kick_fundamental': (40, 80),      # Kick fundamental
@@ -69,14 +82,8 @@ class MaskingAnalyzer:
         for name, audio in stems.items():
             # Convert stereo to mono if needed
             if audio.ndim > 1:
-                audio = np.mean(audio, axis=0)
-            
-            stft = librosa.stft(
-                audio,
-                n_fft=self.n_fft,
-                hop_length=self.hop_length
-            )
-            spectrograms[name] = np.abs(stft)
+                audio = np.mean(audio, axis=0, dtype=np.float32)
+            spectrograms[name] = self._stft_magnitude(audio)
         
         # Analyze conflicts
         conflicts = []
@@ -92,6 +99,17 @@ class MaskingAnalyzer:
             ('snare', 'vocal', 'presence')
         ]
         
+        # Normalised band envelopes, shared by every pair using the same
+        # stem and band
+        envelopes = {}
+        
+        def band_envelope(name: str, band_name: str) -> np.ndarray:
+            if (name, band_name) not in envelopes:
+                envelopes[name, band_name] = self._band_envelope(
+                    spectrograms[name], self.critical_bands[band_name]
+                )
+            return envelopes[name, band_name]
+        
         for stem1_role, stem2_role, band_name in conflict_pairs:
             # Find stems with these roles
             stem1_names = [n for n, r in stem_roles.items() if r == stem1_role]
@@ -101,8 +119,8 @@ class MaskingAnalyzer:
                 for s2 in stem2_names:
                     if s1 in spectrograms and s2 in spectrograms:
                         conflict = self._detect_conflict(
-                            spectrograms[s1],
-                            spectrograms[s2],
+                            band_envelope(s1, band_name),
+                            band_envelope(s2, band_name),
                             self.critical_bands[band_name],
                             s1,
                             s2
@@ -136,46 +154,107 @@ class MaskingAnalyzer:
         
         return result
     
+    def _stft_magnitude(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Magnitude STFT of one signal, matching librosa.stft defaults
+        
+        Frames are transformed FRAME_BLOCK at a time into a preallocated
+        float32 result, so the windowed frames and complex spectrum never
+        exist for the whole signal at once.
+        
+        Args:
+            audio: Mono signal
+            
+        Returns:
+            Magnitude spectrogram, shape (1 + n_fft // 2, frames)
+        """
+        padded = np.pad(np.asarray(audio, dtype=np.float32), self.n_fft // 2)
+        frames = sliding_window_view(padded, self.n_fft)[::self.hop_length]
+        
+        magnitude = np.empty((1 + self.n_fft // 2, len(frames)), dtype=np.float32)
+        for start in range(0, len(frames), self.FRAME_BLOCK):
+            block = frames[start:start + self.FRAME_BLOCK] * self._window
+            spectrum = scipy.fft.rfft(block, axis=-1, workers=-1)
+            magnitude[:, start:start + len(block)] = np.abs(spectrum).T
+        
+        return magnitude
+    
+    def _band_slice(self, freq_range: Tuple[float, float]) -> slice:
+        """
+        STFT bins of a frequency range for the current sample rate
+        
+        Args:
+            freq_range: Frequency range (low, high), high exclusive
+            
+        Returns:
+            Slice over the frequency axis of a spectrogram
+        """
+        if self._band_slices_rate != self.sample_rate:
+            self._band_slices = {}
+            self._band_slices_rate = self.sample_rate
+        
+        if freq_range not in self._band_slices:
+            freqs = np.fft.rfftfreq(self.n_fft, 1 / self.sample_rate)
+            low_bin, high_bin = np.searchsorted(freqs, freq_range)
+            self._band_slices[freq_range] = slice(int(low_bin), int(high_bin))
+        
+        return self._band_slices[freq_range]
+    
+    def _band_envelope(
+        self,
+        spec: np.ndarray,
+        freq_range: Tuple[float, float]
+    ) -> np.ndarray:
+        """
+        Energy envelope of a spectrogram in a frequency range
+        
+        Args:
+            spec: Magnitude spectrogram
+            freq_range: Frequency range to analyze (low, high)
+            
+        Returns:
+            Mean magnitude per frame, normalized to its maximum
+        """
+        # Extract energy in this range
+        energy = np.mean(spec[self._band_slice(freq_range), :], axis=0)
+        if len(energy) == 0:
+            return energy
+        
+        # Normalize
+        return energy / (np.max(energy) + 1e-10)
+    
     def _detect_conflict(
         self,
-        spec1: np.ndarray,
-        spec2: np.ndarray,
+        energy1_norm: np.ndarray,
+        energy2_norm: np.ndarray,
         freq_range: Tuple[float, float],
         name1: str,
         name2: str
     ) -> Dict:
         """
-        Detect conflict between two spectrograms in a frequency range
+        Detect conflict between two stems in a frequency range
         
         Args:
-            spec1: First spectrogram
-            spec2: Second spectrogram
-            freq_range: Frequency range to analyze (low, high)
+            energy1_norm: Normalized band envelope of first stem
+            energy2_norm: Normalized band envelope of second stem
+            freq_range: Frequency range analyzed (low, high)
             name1: Name of first stem
             name2: Name of second stem
             
         Returns:
             Dictionary with conflict information
         """
-        # Get frequency bins
-        freqs = librosa.fft_frequencies(sr=self.sample_rate, n_fft=self.n_fft)
-        
-        # Find bins in range
-        low, high = freq_range
-        mask = (freqs >= low) & (freqs < high)
-        
-        # Extract energy in this range
-        energy1 = np.mean(spec1[mask, :], axis=0)
-        energy2 = np.mean(spec2[mask, :], axis=0)
-        
         # Calculate overlap (correlation)
-        if len(energy1) > 0 and len(energy2) > 0:
-            # Normalize
-            energy1_norm = energy1 / (np.max(energy1) + 1e-10)
-            energy2_norm = energy2 / (np.max(energy2) + 1e-10)
-            
-            # Correlation
-            correlation = np.corrcoef(energy1_norm, energy2_norm)[0, 1]
+        if len(energy1_norm) > 0 and len(energy2_norm) > 0:
+            # Pearson correlation from three dot products (NaN when either
+            # envelope is constant, as with np.corrcoef)
+            centered1 = energy1_norm - energy1_norm.mean()
+            centered2 = energy2_norm - energy2_norm.mean()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                correlation = np.dot(centered1, centered2) / np.sqrt(
+                    np.dot(centered1, centered1) * np.dot(centered2, centered2)
+                )
+            correlation = np.clip(correlation, -1.0, 1.0)
             
             # Overlap (both high at same time)
             overlap = np.mean(np.minimum(energy1_norm, energy2_norm))
@@ -283,12 +362,15 @@ class MaskingAnalyzer:
         Returns:
             Dictionary with balance analysis
         """
-        # Sum all spectrograms
-        total_spec = sum(spectrograms.values())
+        # Sum all spectrograms, accumulating in place into one buffer
+        total_spec = None
+        for spec in spectrograms.values():
+            if total_spec is None:
+                total_spec = spec.copy()
+            else:
+                np.add(total_spec, spec, out=total_spec)
         
         # Analyze energy in different bands
-        freqs = librosa.fft_frequencies(sr=self.sample_rate, n_fft=self.n_fft)
-        
         bands = {
             'sub_bass': (20, 60),
             'bass': (60, 250),
@@ -299,12 +381,17 @@ class MaskingAnalyzer:
             'air': (10000, 20000)
         }
         
+        # Only frames within 40 dB of the loudest one count, so silent
+        # intros, outros and gaps don't skew the balance
+        frame_energy = total_spec.sum(axis=0)
+        active = frame_energy > 0.01 * frame_energy.max()
+        
         balance = {}
-        total_energy = np.sum(total_spec)
+        total_energy = np.sum(frame_energy[active])
         
-        for band_name, (low, high) in bands.items():
-            mask = (freqs >= low) & (freqs < high)
-            band_energy = np.sum(total_spec[mask, :])
+        for band_name, freq_range in bands.items():
+            band_frame_energy = total_spec[self._band_slice(freq_range), :].sum(axis=0)
+            band_energy = np.sum(band_frame_energy[active])
             balance[band_name] = float(band_energy / (total_energy + 1e-10))
         
         # Detect imbalances
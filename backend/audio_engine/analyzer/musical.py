@@ -5,6 +5,8 @@ Detects tempo, key, beat grid, and harmonic content
 
 import numpy as np
 import librosa
+import scipy.fft
+import scipy.signal
 from typing import Dict, Optional, Tuple
 import logging
 
@@ -14,6 +16,35 @@ logger = logging.getLogger(__name__)
 class MusicalAnalyzer:
     """Musical feature extraction"""
     
+    # Key profiles (Krumhansl-Schmuckler), normalized to unit sum
+    MAJOR_PROFILE = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09,
+                              2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
+    MAJOR_PROFILE = MAJOR_PROFILE / np.sum(MAJOR_PROFILE)
+    MINOR_PROFILE = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53,
+                              2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
+    MINOR_PROFILE = MINOR_PROFILE / np.sum(MINOR_PROFILE)
+    
+    # Note names
+    NOTES = ('C', 'C#', 'D', 'D#', 'E', 'F',
+             'F#', 'G', 'G#', 'A', 'A#', 'B')
+    
+    # Mean-centered profiles as (12, 2) [major, minor] columns, and their
+    # norms, for correlating against chroma
+    _PROFILES_CENTERED = np.stack([MAJOR_PROFILE - MAJOR_PROFILE.mean(),
+                                   MINOR_PROFILE - MINOR_PROFILE.mean()], axis=1)
+    _PROFILE_NORMS = np.linalg.norm(_PROFILES_CENTERED, axis=0)
+    
+    # Index table of every chroma rotation: row i gathers np.roll(x, i)
+    _ROTATIONS = (np.arange(12)[None, :] - np.arange(12)[:, None]) % 12
+    
+    # Longest chroma sequence detect_sections builds a self-similarity
+    # matrix over; longer ones are averaged down to about this many frames
+    MAX_SECTION_FRAMES = 4000
+    
+    # Median filter length for harmonic-percussive separation (librosa's
+    # default kernel_size)
+    HPSS_KERNEL = 31
+    
     def __init__(self, sample_rate: int = 48000):
         """
         Initialize musical analyzer
@@ -35,11 +66,40 @@ class MusicalAnalyzer:
         """
         logger.info("Performing musical analysis...")
         
+        # Single precision throughout: halves the STFT/CQT buffers and
+        # FFT work without affecting the features
+        audio = np.asarray(audio, dtype=np.float32)
+        
         features = {}
         
+        # Magnitude STFT, shared by the mel spectrogram and HPSS. The FFT-heavy
+        # transforms spread over all cores (librosa uses scipy.fft, see the
+        # package __init__)
+        with scipy.fft.set_workers(-1):
+            magnitude = np.abs(librosa.stft(audio))
+        
+        # Log-power mel spectrogram, from which beat tracking, onset
+        # detection and the tempogram would each compute their own
+        mel_db = librosa.power_to_db(librosa.feature.melspectrogram(
+            S=magnitude ** 2,
+            sr=self.sample_rate
+        ))
+        
+        # Onset strength for onsets and the tempogram; beat tracking
+        # aggregates across mel bands by median instead
+        onset_env = librosa.onset.onset_strength(
+            S=mel_db,
+            sr=self.sample_rate
+        )
+        beat_env = librosa.onset.onset_strength(
+            S=mel_db,
+            sr=self.sample_rate,
+            aggregate=np.median
+        )
+        
         # Tempo and beat detection
         tempo, beats = librosa.beat.beat_track(
-            y=audio,
+            onset_envelope=beat_env,
             sr=self.sample_rate,
             units='time'
         )
@@ -48,10 +108,6 @@ class MusicalAnalyzer:
         features['beat_count'] = len(beats)
         
         # Onset detection (transients)
-        onset_env = librosa.onset.onset_strength(
-            y=audio,
-            sr=self.sample_rate
-        )
         onsets = librosa.onset.onset_detect(
             onset_envelope=onset_env,
             sr=self.sample_rate,
@@ -61,22 +117,19 @@ class MusicalAnalyzer:
         features['onset_count'] = len(onsets)
         
         # Key detection
-        chroma = librosa.feature.chroma_cqt(
-            y=audio,
-            sr=self.sample_rate
-        )
+        with scipy.fft.set_workers(-1):
+            chroma = librosa.feature.chroma_cqt(
+                y=audio,
+                sr=self.sample_rate
+            )
         
         # Estimate key from chroma
         key_name, key_confidence = self._estimate_key(chroma)
         features['key'] = key_name
         features['key_confidence'] = float(key_confidence)
         
-        # Harmonic-percussive separation
-        harmonic, percussive = librosa.effects.hpss(audio)
-        
-        # Measure harmonic vs percussive ratio
-        harmonic_energy = np.sum(harmonic ** 2)
-        percussive_energy = np.sum(percussive ** 2)
+        # Harmonic vs percussive ratio
+        harmonic_energy, percussive_energy = self._hpss_energies(magnitude)
         total_energy = harmonic_energy + percussive_energy
         
         if total_energy > 0:
@@ -87,16 +140,52 @@ class MusicalAnalyzer:
             features['percussive_ratio'] = 0.5
         
         # Rhythm patterns
-        tempogram = librosa.feature.tempogram(
-            y=audio,
-            sr=self.sample_rate
-        )
+        with scipy.fft.set_workers(-1):
+            tempogram = librosa.feature.tempogram(
+                onset_envelope=onset_env,
+                sr=self.sample_rate
+            )
         features['rhythm_strength'] = float(np.mean(np.abs(tempogram)))
         
         logger.info(f"Musical analysis complete: Tempo={tempo:.1f} BPM, Key={key_name}")
         
         return features
     
+    def _hpss_energies(self, magnitude: np.ndarray) -> Tuple[float, float]:
+        """
+        Harmonic and percussive energies by median-filtering HPSS
+        
+        Same soft masks as librosa.effects.hpss, but the energies are summed
+        in the spectrogram domain instead of resynthesizing both components.
+        
+        Args:
+            magnitude: Magnitude STFT (bins x frames)
+            
+        Returns:
+            Tuple of (harmonic_energy, percussive_energy)
+        """
+        half = self.HPSS_KERNEL // 2
+        
+        # Median filters across time (harmonic) and frequency (percussive);
+        # symmetric padding matches librosa's reflect-mode median filter
+        harmonic = scipy.signal.medfilt2d(
+            np.pad(magnitude, ((0, 0), (half, half)), mode='symmetric'),
+            (1, self.HPSS_KERNEL)
+        )[:, half:-half]
+        percussive = scipy.signal.medfilt2d(
+            np.pad(magnitude, ((half, half), (0, 0)), mode='symmetric'),
+            (self.HPSS_KERNEL, 1)
+        )[half:-half]
+        
+        mask_harmonic = librosa.util.softmask(harmonic, percussive, power=2, split_zeros=True)
+        mask_percussive = librosa.util.softmask(percussive, harmonic, power=2, split_zeros=True)
+        
+        # One-sided spectrum: every bin but DC and Nyquist counts twice
+        power = magnitude ** 2
+        power[1:-1] *= 2
+        
+        return float(np.sum(mask_harmonic * power)), float(np.sum(mask_percussive * power))
+    
     def _estimate_key(
         self, 
         chroma: np.ndarray
@@ -116,39 +205,29 @@ class MusicalAnalyzer:
         # Normalize
         chroma_mean = chroma_mean / (np.sum(chroma_mean) + 1e-10)
         
-        # Key profiles (Krumhansl-Schmuckler)
-        major_profile = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 
-                                 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
-        minor_profile = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53,
-                                 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
-        
-        # Normalize profiles
-        major_profile = major_profile / np.sum(major_profile)
-        minor_profile = minor_profile / np.sum(minor_profile)
-        
-        # Note names
-        notes = ['C', 'C#', 'D', 'D#', 'E', 'F', 
-                'F#', 'G', 'G#', 'A', 'A#', 'B']
-        
-        # Try all rotations for major and minor
-        max_corr = -1
-        best_key = 'C major'
-        
-        for i in range(12):
-            # Rotate chroma
-            rotated = np.roll(chroma_mean, i)
-            
-            # Correlate with major
-            corr_major = np.corrcoef(rotated, major_profile)[0, 1]
-            if corr_major > max_corr:
-                max_corr = corr_major
-                best_key = f"{notes[i]} major"
-            
-            # Correlate with minor
-            corr_minor = np.corrcoef(rotated, minor_profile)[0, 1]
-            if corr_minor > max_corr:
-                max_corr = corr_minor
-                best_key = f"{notes[i]} minor"
+        # Every rotation of the chroma at once: row i is np.roll(chroma_mean, i)
+        rotated = chroma_mean[self._ROTATIONS]
+        
+        # Pearson correlation of each rotation with each profile, as a
+        # (12, 2) array of [major, minor] per rotation
+        rotated_centered = rotated - rotated.mean(axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlations = (rotated_centered @ self._PROFILES_CENTERED) / np.outer(
+                np.linalg.norm(rotated_centered, axis=1),
+                self._PROFILE_NORMS
+            )
+        correlations = np.nan_to_num(np.clip(correlations, -1, 1), nan=-1)
+        
+        # First best match in (rotation, major before minor) order; nothing
+        # above -1 (e.g. flat chroma) falls back to C major
+        best = int(np.argmax(correlations))
+        max_corr = correlations.flat[best]
+        if max_corr > -1:
+            rotation, mode = divmod(best, 2)
+            best_key = f"{self.NOTES[rotation]} {('major', 'minor')[mode]}"
+        else:
+            max_corr = -1
+            best_key = 'C major'
         
         confidence = max(0.0, min(1.0, max_corr))
         
@@ -258,12 +337,25 @@ class MusicalAnalyzer:
         Returns:
             Array of section boundary times
         """
+        # Too short to hold more than one section
+        duration = audio.shape[-1] / self.sample_rate
+        if duration < 2 * min_section_length:
+            return np.array([0.0])
+        
         # Compute chroma features
         chroma = librosa.feature.chroma_cqt(
             y=audio,
             sr=self.sample_rate
         )
         
+        # The self-similarity matrix is quadratic in the number of frames, so
+        # average long chroma sequences over fixed-size groups of frames
+        frames = np.arange(chroma.shape[1])
+        if chroma.shape[1] > self.MAX_SECTION_FRAMES:
+            step = -(-chroma.shape[1] // self.MAX_SECTION_FRAMES)
+            frames = frames[::step]
+            chroma = librosa.util.sync(chroma, frames, aggregate=np.mean)
+        
         # Compute self-similarity matrix
         similarity = librosa.segment.recurrence_matrix(
             chroma,
@@ -278,16 +370,19 @@ class MusicalAnalyzer:
         
         # Convert to times
         boundary_times = librosa.frames_to_time(
-            boundaries,
+            frames[boundaries],
             sr=self.sample_rate
         )
         
-        # Filter out sections that are too short
+        # Filter out sections that are too short. Each kept boundary depends
+        # on the previous kept one, so this is a single greedy scan over
+        # plain floats rather than NumPy scalars
         if len(boundary_times) > 1:
-            filtered_boundaries = [boundary_times[0]]
-            for i in range(1, len(boundary_times)):
-                if boundary_times[i] - filtered_boundaries[-1] >= min_section_length:
-                    filtered_boundaries.append(boundary_times[i])
+            times = boundary_times.tolist()
+            filtered_boundaries = [times[0]]
+            for time in times[1:]:
+                if time - filtered_boundaries[-1] >= min_section_length:
+                    filtered_boundaries.append(time)
             boundary_times = np.array(filtered_boundaries)
         
         return boundary_times
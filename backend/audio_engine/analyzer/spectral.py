@@ -5,6 +5,7 @@ Extracts spectral features using STFT, CQT, and MFCC
 
 import numpy as np
 import librosa
+import scipy.fft
 from typing import Dict, Tuple
 import logging
 
@@ -14,6 +15,19 @@ logger = logging.getLogger(__name__)
 class SpectralAnalyzer:
     """Spectral analysis for audio signals"""
     
+    # Contiguous bands reported by analyze_frequency_bands, as
+    # (name, lower edge in Hz); the last band ends at BAND_TOP
+    FREQUENCY_BANDS = (
+        ('sub_bass', 20),      # Sub bass
+        ('bass', 60),          # Bass
+        ('low_mid', 250),      # Low mids
+        ('mid', 500),          # Mids
+        ('high_mid', 2000),    # High mids
+        ('presence', 4000),    # Presence
+        ('brilliance', 6000),  # Brilliance/Air
+    )
+    BAND_TOP = 20000
+    
     def __init__(
         self,
         sample_rate: int = 48000,
@@ -32,54 +46,64 @@ class SpectralAnalyzer:
         self.n_fft = n_fft
         self.hop_length = hop_length
         
-    def analyze(self, audio: np.ndarray) -> Dict:
+        # STFT bin of each band edge, built lazily for the current sample rate
+        self._band_edges = None
+        self._band_edges_rate = None
+        
+        # Analysis window, and an STFT output buffer reused (and grown as
+        # needed) across calls
+        self._window = librosa.filters.get_window('hann', n_fft, fftbins=True).astype(np.float32)
+        self._stft_buffer = None
+        
+    def analyze(self, audio: np.ndarray, include_phase: bool = False) -> Dict:
         """
         Perform spectral analysis on audio
         
         Args:
             audio: Audio signal (mono)
+            include_phase: Also return the STFT phase ('stft_phase'), which
+                none of the features need
             
         Returns:
             Dictionary with spectral features
         """
         logger.info("Performing spectral analysis...")
         
+        # Single precision throughout: halves the STFT/CQT buffers and
+        # FFT work without affecting the features
+        audio = np.asarray(audio, dtype=np.float32)
+        
         features = {}
         
-        # STFT - Short-Time Fourier Transform
-        stft = librosa.stft(
-            audio,
-            n_fft=self.n_fft,
-            hop_length=self.hop_length
-        )
+        # STFT - Short-Time Fourier Transform, computed once and shared by
+        # every STFT-based feature below. The FFT-heavy transforms spread
+        # over all cores (librosa uses scipy.fft, see the package __init__)
+        with scipy.fft.set_workers(-1):
+            stft = self._stft(audio, self.hop_length)
         magnitude = np.abs(stft)
         features['stft_magnitude'] = magnitude
-        features['stft_phase'] = np.angle(stft)
+        if include_phase:
+            features['stft_phase'] = np.angle(stft)
+        power = magnitude ** 2
         
         # Spectral centroid
         spectral_centroid = librosa.feature.spectral_centroid(
-            y=audio,
-            sr=self.sample_rate,
-            n_fft=self.n_fft,
-            hop_length=self.hop_length
+            S=magnitude,
+            sr=self.sample_rate
         )
         features['spectral_centroid'] = np.mean(spectral_centroid)
         
         # Spectral rolloff
         spectral_rolloff = librosa.feature.spectral_rolloff(
-            y=audio,
-            sr=self.sample_rate,
-            n_fft=self.n_fft,
-            hop_length=self.hop_length
+            S=magnitude,
+            sr=self.sample_rate
         )
         features['spectral_rolloff'] = np.mean(spectral_rolloff)
         
         # Spectral bandwidth
         spectral_bandwidth = librosa.feature.spectral_bandwidth(
-            y=audio,
-            sr=self.sample_rate,
-            n_fft=self.n_fft,
-            hop_length=self.hop_length
+            S=magnitude,
+            sr=self.sample_rate
         )
         features['spectral_bandwidth'] = np.mean(spectral_bandwidth)
         
@@ -92,20 +116,23 @@ class SpectralAnalyzer:
         features['zero_crossing_rate'] = np.mean(zcr)
         
         # CQT - Constant-Q Transform
-        cqt = np.abs(librosa.cqt(
-            audio,
-            sr=self.sample_rate,
-            hop_length=self.hop_length
-        ))
+        with scipy.fft.set_workers(-1):
+            cqt = np.abs(librosa.cqt(
+                audio,
+                sr=self.sample_rate,
+                hop_length=self.hop_length
+            ))
         features['cqt'] = cqt
         
         # MFCC - Mel-Frequency Cepstral Coefficients
+        mel = librosa.feature.melspectrogram(
+            S=power,
+            sr=self.sample_rate
+        )
         mfcc = librosa.feature.mfcc(
-            y=audio,
+            S=librosa.power_to_db(mel),
             sr=self.sample_rate,
-            n_mfcc=13,
-            n_fft=self.n_fft,
-            hop_length=self.hop_length
+            n_mfcc=13
         )
         features['mfcc'] = mfcc
         features['mfcc_mean'] = np.mean(mfcc, axis=1)
@@ -113,20 +140,16 @@ class SpectralAnalyzer:
         
         # Chroma features
         chroma = librosa.feature.chroma_stft(
-            y=audio,
-            sr=self.sample_rate,
-            n_fft=self.n_fft,
-            hop_length=self.hop_length
+            S=power,
+            sr=self.sample_rate
         )
         features['chroma'] = chroma
         features['chroma_mean'] = np.mean(chroma, axis=1)
         
         # Spectral contrast
         contrast = librosa.feature.spectral_contrast(
-            y=audio,
-            sr=self.sample_rate,
-            n_fft=self.n_fft,
-            hop_length=self.hop_length
+            S=magnitude,
+            sr=self.sample_rate
         )
         features['spectral_contrast'] = contrast
         features['spectral_contrast_mean'] = np.mean(contrast, axis=1)
@@ -134,6 +157,38 @@ class SpectralAnalyzer:
         logger.info("Spectral analysis complete")
         return features
     
+    def _stft(self, audio: np.ndarray, hop_length: int) -> np.ndarray:
+        """
+        STFT with the cached window, written into the reusable output buffer
+        
+        The result is a view of the buffer, so it is only valid until the
+        next call; callers derive what they keep from it.
+        
+        Args:
+            audio: Audio signal
+            hop_length: Hop length in samples
+            
+        Returns:
+            Complex STFT matrix
+        """
+        n_frames = 1 + audio.shape[-1] // hop_length
+        shape = audio.shape[:-1] + (1 + self.n_fft // 2,)
+        dtype = librosa.util.dtype_r2c(audio.dtype)
+        
+        buffer = self._stft_buffer
+        if (buffer is None or buffer.shape[:-1] != shape
+                or buffer.dtype != dtype or buffer.shape[-1] < n_frames):
+            buffer = np.empty(shape + (n_frames,), dtype=dtype)
+            self._stft_buffer = buffer
+        
+        return librosa.stft(
+            audio,
+            n_fft=self.n_fft,
+            hop_length=hop_length,
+            window=self._window,
+            out=buffer
+        )
+    
     def detect_peaks(
         self, 
         audio: np.ndarray,
@@ -150,8 +205,8 @@ class SpectralAnalyzer:
             Array of peak frequencies
         """
         # Compute power spectrum
-        stft = librosa.stft(audio, n_fft=self.n_fft)
-        power = np.abs(stft) ** 2
+        stft = self._stft(audio, self.n_fft // 4)
+        power = librosa.util.abs2(stft)
         
         # Average over time
         avg_power = np.mean(power, axis=1)
@@ -166,6 +221,16 @@ class SpectralAnalyzer:
         
         return peak_freqs
     
+    def _frequency_band_edges(self) -> np.ndarray:
+        """STFT bin index of each FREQUENCY_BANDS edge for the current sample rate"""
+        if self._band_edges_rate != self.sample_rate:
+            freqs = librosa.fft_frequencies(sr=self.sample_rate, n_fft=self.n_fft)
+            edges = [low for _, low in self.FREQUENCY_BANDS] + [self.BAND_TOP]
+            self._band_edges = np.searchsorted(freqs, edges)
+            self._band_edges_rate = self.sample_rate
+        
+        return self._band_edges
+    
     def analyze_frequency_bands(
         self, 
         audio: np.ndarray
@@ -180,32 +245,20 @@ class SpectralAnalyzer:
             Dictionary with band energies
         """
         # Compute STFT
-        stft = librosa.stft(audio, n_fft=self.n_fft)
-        power = np.abs(stft) ** 2
+        stft = self._stft(audio, self.n_fft // 4)
+        power = librosa.util.abs2(stft)
         
-        # Frequency bins
-        freqs = librosa.fft_frequencies(sr=self.sample_rate, n_fft=self.n_fft)
+        # Energy per frequency bin, then per band as differences of its
+        # running sum at the band edges
+        bin_energy = np.sum(power, axis=1, dtype=np.float64)
+        cumulative = np.concatenate(([0.0], np.cumsum(bin_energy)))
+        edge_energy = cumulative[self._frequency_band_edges()]
         
-        # Define bands
-        bands = {
-            'sub_bass': (20, 60),      # Sub bass
-            'bass': (60, 250),         # Bass
-            'low_mid': (250, 500),     # Low mids
-            'mid': (500, 2000),        # Mids
-            'high_mid': (2000, 4000),  # High mids
-            'presence': (4000, 6000),  # Presence
-            'brilliance': (6000, 20000) # Brilliance/Air
+        band_energies = {
+            band_name: float(band_power)
+            for (band_name, _), band_power in zip(self.FREQUENCY_BANDS, np.diff(edge_energy))
         }
         
-        band_energies = {}
-        for band_name, (low, high) in bands.items():
-            # Find frequency bins in this band
-            mask = (freqs >= low) & (freqs < high)
-            
-            # Sum energy in this band
-            band_power = np.sum(power[mask, :])
-            band_energies[band_name] = float(band_power)
-        
         # Normalize by total energy
         total_energy = sum(band_energies.values())
         if total_energy > 0:
@@ -1,15 +1,26 @@
 import numpy as np
+import pyloudnorm as pyln
 import soundfile as sf
+from scipy import signal
 from matchering import process, Result
 from matchering.results import pcm16, pcm24
 from pedalboard import Pedalboard, Limiter, Gain
 from typing import Optional, Callable
 from config import settings
+from .analyzer.loudness import (
+    CHANNEL_GAINS, GATING_BLOCK_DURATION, gated_loudness, gating_block_edges, k_weighting_sos
+)
 
 
 class AudioMasterer:
     """Audio mastering engine using Matchering"""
     
+    # Frames per block when streaming files through the standalone chain
+    BLOCK_SIZE = 65536
+    
+    # Shortest block handed to pedalboard (shorter final blocks are padded)
+    MIN_BLOCK_SIZE = 64
+    
     def __init__(self):
         self.sample_rate = 44100
         self.target_lufs = settings.TARGET_LUFS
@@ -66,15 +77,18 @@ class AudioMasterer:
         """
         Master without reference using custom chain
         
+        The file is streamed in blocks twice (once to measure loudness,
+        once through the chain), so memory stays bounded by the block size.
+        
         Args:
             input_file: Path to input file
             output_file: Path to output file
         """
-        # Load audio
-        audio, sr = sf.read(input_file)
+        info = sf.info(input_file)
+        sr = info.samplerate
         
         # Calculate current loudness
-        current_lufs = self._calculate_lufs(audio)
+        current_lufs = self._calculate_lufs(input_file)
         
         # Calculate gain adjustment to reach target LUFS
         gain_adjustment = self.target_lufs - current_lufs
@@ -91,29 +105,80 @@ class AudioMasterer:
             )
         ])
         
-        # Process audio
-        if len(audio.shape) == 1:
-            # Mono
-            mastered = mastering_chain(audio, sample_rate=sr)
-        else:
-            # Stereo
-            mastered = mastering_chain(audio.T, sample_rate=sr).T
-        
-        # Save mastered file
-        sf.write(output_file, mastered, sr, subtype='PCM_24')
+        # Process audio block by block, carrying the chain's state across
+        # blocks (identical to processing the whole file at once)
+        with sf.SoundFile(
+            output_file, 'w', samplerate=sr, channels=info.channels, subtype='PCM_24'
+        ) as output:
+            first = True
+            for block in sf.blocks(input_file, blocksize=self.BLOCK_SIZE, dtype='float32', always_2d=True):
+                n = len(block)
+                
+                # Pedalboard can't tell channels from samples in a tiny final
+                # block, so pad it; the chain is causal and the padding is cut
+                if n < self.MIN_BLOCK_SIZE:
+                    block = np.pad(block, ((0, self.MIN_BLOCK_SIZE - n), (0, 0)))
+                
+                mastered = mastering_chain(
+                    np.ascontiguousarray(block.T), sample_rate=sr, reset=first
+                )
+                output.write(mastered[:, :n].T)
+                first = False
     
-    def _calculate_lufs(self, audio: np.ndarray) -> float:
+    def _calculate_lufs(self, input_file: str) -> float:
         """
-        Calculate integrated loudness (LUFS)
+        Calculate integrated loudness (LUFS) of a file, streamed in blocks
+        
+        K-weighting runs across blocks with carried filter state. Only the
+        running sum of the power at the gating block edges is kept, and the
+        blocks are gated exactly as LoudnessAnalyzer gates a whole signal.
         
         Args:
-            audio: Audio data
+            input_file: Path to audio file
             
         Returns:
             Loudness in LUFS
         """
-        # Simple RMS-based loudness estimation
-        # (In production, use pyloudnorm for accurate LUFS)
-        rms = np.sqrt(np.mean(audio ** 2))
-        lufs = 20 * np.log10(rms) - 0.691
-        return float(lufs)
+        info = sf.info(input_file)
+        sr = info.samplerate
+        
+        sos = k_weighting_sos(pyln.Meter(sr))
+        channel_gains = CHANNEL_GAINS[:info.channels]
+        zi = np.zeros((len(sos), 2, info.channels))
+        
+        # Running sum of the power at every gating block edge
+        if info.frames >= GATING_BLOCK_DURATION * sr:
+            lower, upper = gating_block_edges(info.frames, sr)
+        else:
+            lower = upper = np.zeros(0, dtype=int)
+        edges = np.union1d(lower, upper)
+        cumulative = np.zeros(len(edges))
+        
+        total = 0.0
+        sum_squares = 0.0
+        n_samples = 0
+        
+        for block in sf.blocks(input_file, blocksize=self.BLOCK_SIZE, dtype='float32', always_2d=True):
+            samples = block.ravel()
+            sum_squares += float(np.dot(samples, samples))
+            
+            filtered, zi = signal.sosfilt(sos, block.astype(np.float64), axis=0, zi=zi)
+            running = total + np.cumsum(np.square(filtered) @ channel_gains)
+            
+            # Edges inside this block: (n_samples, n_samples + len(block)]
+            inside = (edges > n_samples) & (edges <= n_samples + len(block))
+            cumulative[inside] = running[edges[inside] - n_samples - 1]
+            
+            total = running[-1] if len(running) else total
+            n_samples += len(block)
+        
+        if n_samples < GATING_BLOCK_DURATION * sr:
+            # Shorter than one gating block: simple RMS-based estimate
+            rms = np.sqrt(sum_squares / max(n_samples * info.channels, 1))
+            return float(20 * np.log10(rms) - 0.691)
+        
+        block_power = (
+            cumulative[np.searchsorted(edges, upper)] - cumulative[np.searchsorted(edges, lower)]
+        ) / (GATING_BLOCK_DURATION * sr)
+        
+        return float(gated_loudness(block_power))
@@ -4,7 +4,8 @@ Grammy-level mastering chain with genre-specific processing
 """
 
 import numpy as np
-from typing import Dict, Optional, List, Any
+from dataclasses import dataclass
+from typing import Dict, Optional, List, Any, Tuple
 import logging
 
 from ..analyzer import LoudnessAnalyzer
@@ -16,6 +17,76 @@ from .pro_multiband import ProMultibandCompressor
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True, slots=True)
+class MasterPreset:
+    """
+    Mastering chain settings, resolved once per master() call.
+    
+    Built from a genre preset dict (or the conservative defaults) by
+    from_genre_preset, so the chain reads plain attributes instead of
+    looking keys up with their fallbacks at every step.
+    """
+    eq_bands: tuple
+    multiband: Optional[Dict[str, Any]]
+    saturation_tape: float
+    saturation_tube: float
+    stereo_width: int
+    limiter_ceiling: float
+    limiter_release_ms: float
+    
+    # Default conservative EQ, used when no genre preset is given
+    DEFAULT_EQ_BANDS = (
+        {'type': 'low_shelf', 'frequency': 60, 'gain': 0.5, 'q': 0.7},
+        {'type': 'peak', 'frequency': 200, 'gain': -0.5, 'q': 1.5},
+        {'type': 'peak', 'frequency': 3000, 'gain': 1.0, 'q': 1.5},
+        {'type': 'high_shelf', 'frequency': 10000, 'gain': 1.0, 'q': 0.7}
+    )
+    
+    @classmethod
+    def from_genre_preset(
+        cls,
+        genre_preset: Optional[Dict[str, Any]],
+        ceiling_dbTP: float,
+        max_width_percent: int
+    ) -> 'MasterPreset':
+        """
+        Resolve a genre preset dict into a MasterPreset
+        
+        Args:
+            genre_preset: Genre-specific mastering settings (None or empty
+                for the defaults)
+            ceiling_dbTP: True peak ceiling, unless the preset sets one
+            max_width_percent: Stereo width, unless the preset sets one
+            
+        Returns:
+            MasterPreset
+        """
+        if not genre_preset:
+            return cls(
+                eq_bands=cls.DEFAULT_EQ_BANDS,
+                multiband=None,
+                saturation_tape=0.15,
+                saturation_tube=0.10,
+                stereo_width=max_width_percent,
+                limiter_ceiling=ceiling_dbTP,
+                limiter_release_ms=100
+            )
+        
+        # An empty saturation dict means no saturation at all
+        saturation = genre_preset.get('saturation', {})
+        limiter = genre_preset.get('limiter', {})
+        
+        return cls(
+            eq_bands=tuple(genre_preset.get('eq', [])),
+            multiband=genre_preset.get('multiband', None),
+            saturation_tape=saturation.get('tape', 0.15) if saturation else 0,
+            saturation_tube=saturation.get('tube', 0.10) if saturation else 0,
+            stereo_width=genre_preset.get('stereo_width', max_width_percent),
+            limiter_ceiling=limiter.get('ceiling', ceiling_dbTP),
+            limiter_release_ms=limiter.get('release', 100)
+        )
+
+
 class MasteringEngine:
     """
     Professional mastering engine with genre-aware processing.
@@ -23,6 +94,13 @@ class MasteringEngine:
     based on genre-specific presets.
     """
     
+    # Samples per block when accumulating channel statistics
+    STATS_BLOCK_SIZE = 65536
+    
+    # Samples per tile in _process_tiled (a stereo float64 tile and its
+    # intermediates fit in L2)
+    TILE_SIZE = 16384
+    
     def __init__(self, sample_rate: int = 48000):
         self.sample_rate = sample_rate
         self.eq = StudioEQ(sample_rate)
@@ -59,37 +137,33 @@ class MasteringEngine:
         """
         logger.info(f"Starting mastering (target: {target_lufs} LUFS, preset: {preset})...")
         
+        # Single precision, contiguous, through the whole chain: every stage
+        # below preserves float32, halving the memory traffic of each pass
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        
+        # Mono input (1-D, or a single channel row) runs as 1-D through
+        # every stage: no width stage, and single-channel limiting
+        input_shape = audio.shape
+        is_mono = audio.ndim == 1 or audio.shape[0] == 1
+        if is_mono:
+            audio = audio.reshape(-1)
+        
         processing_log = []
         
         # Use genre preset if available, else use defaults
         if genre_preset:
             logger.info(f"Using genre-specific mastering preset")
-            eq_bands = genre_preset.get('eq', [])
-            multiband_settings = genre_preset.get('multiband', None)
-            saturation_settings = genre_preset.get('saturation', {})
-            stereo_width = genre_preset.get('stereo_width', max_width_percent)
-            limiter_settings = genre_preset.get('limiter', {})
-        else:
-            # Default conservative settings
-            eq_bands = [
-                {'type': 'low_shelf', 'frequency': 60, 'gain': 0.5, 'q': 0.7},
-                {'type': 'peak', 'frequency': 200, 'gain': -0.5, 'q': 1.5},
-                {'type': 'peak', 'frequency': 3000, 'gain': 1.0, 'q': 1.5},
-                {'type': 'high_shelf', 'frequency': 10000, 'gain': 1.0, 'q': 0.7}
-            ]
-            multiband_settings = None
-            saturation_settings = {'tape': 0.15, 'tube': 0.10}
-            stereo_width = max_width_percent
-            limiter_settings = {'ceiling': ceiling_dbTP, 'release': 100}
+        settings = MasterPreset.from_genre_preset(genre_preset, ceiling_dbTP, max_width_percent)
         
         # Step 1: Linear-Phase EQ
         logger.info("Applying mastering EQ...")
-        if eq_bands:
-            audio = self.eq.linear_phase_eq(audio, eq_bands)
-            processing_log.append(f"EQ: {len(eq_bands)} bands")
+        if settings.eq_bands:
+            audio = self.eq.linear_phase_eq(audio, settings.eq_bands)
+            processing_log.append(f"EQ: {len(settings.eq_bands)} bands")
         
         # Step 2: Multiband Compression
         logger.info("Applying multiband compression...")
+        multiband_settings = settings.multiband
         if multiband_settings:
             try:
                 result = self.multiband.process(
@@ -107,25 +181,27 @@ class MasteringEngine:
             except Exception as e:
                 logger.warning(f"Multiband compression failed: {e}, skipping...")
         
-        # Step 3: Saturation
+        # Steps 3-4: Saturation and stereo width, processed together tile by
+        # tile (see _process_tiled)
         logger.info("Applying saturation...")
-        if saturation_settings:
-            tape_amount = saturation_settings.get('tape', 0.15)
-            tube_amount = saturation_settings.get('tube', 0.10)
-            
-            if tape_amount > 0:
-                audio = self.saturator.tape_saturation(audio, drive=tape_amount, mix=0.3)
-                processing_log.append(f"Tape saturation: {tape_amount:.0%}")
-            
-            if tube_amount > 0:
-                audio = self.saturator.tube_saturation(audio, drive=tube_amount, warmth=0.2, mix=0.25)
-                processing_log.append(f"Tube saturation: {tube_amount:.0%}")
+        tape_amount = settings.saturation_tape
+        tube_amount = settings.saturation_tube
+        if tape_amount > 0:
+            processing_log.append(f"Tape saturation: {tape_amount:.0%}")
+        
+        if tube_amount > 0:
+            processing_log.append(f"Tube saturation: {tube_amount:.0%}")
         
-        # Step 4: Stereo Width
         logger.info("Adjusting stereo width...")
-        if audio.ndim > 1 and stereo_width != 100:
-            audio = self.stereo.adjust_width(audio, stereo_width, safe_bass=True)
+        width = None
+        stereo_width = settings.stereo_width
+        if not is_mono and stereo_width != 100:
+            width = stereo_width
             processing_log.append(f"Stereo width: {stereo_width}%")
+            if stereo_width > 140:
+                logger.warning(f"Width {stereo_width}% exceeds safe limit (140%)")
+        
+        audio = self._process_tiled(audio, tape_amount, tube_amount, width)
         
         # Step 5: Loudness Normalization (pre-limiting)
         logger.info("Normalizing loudness...")
@@ -133,8 +209,8 @@ class MasteringEngine:
         
         # Step 6: True-Peak Limiting
         logger.info("Applying true-peak limiting...")
-        limiter_ceiling = limiter_settings.get('ceiling', ceiling_dbTP)
-        release_ms = limiter_settings.get('release', 100)
+        limiter_ceiling = settings.limiter_ceiling
+        release_ms = settings.limiter_release_ms
         
         # BPM-synced release if tempo available
         if tempo_bpm and tempo_bpm > 0:
@@ -150,17 +226,15 @@ class MasteringEngine:
         )
         processing_log.append(f"Limiter: {limiter_ceiling} dBTP")
         
-        # Step 7: Final Loudness Match
+        # Step 7: Final Loudness Match (the limiter output is ours to
+        # scale in place)
         logger.info("Final loudness matching...")
-        audio = self._final_loudness_match(audio, target_lufs, limiter_ceiling)
-        
-        # Final analysis
-        final_metrics = self.loudness_analyzer.analyze(audio)
+        audio, final_metrics = self._final_loudness_match(audio, target_lufs, limiter_ceiling)
         
         logger.info(f"Mastering complete! LUFS={final_metrics['lufs_integrated']:.1f}, TP={final_metrics['true_peak_dbTP']:.1f} dBTP")
         
         return {
-            'audio': audio,
+            'audio': audio.reshape(input_shape) if is_mono else audio,
             'report': {
                 'processing_chain': processing_log,
                 'final_metrics': {
@@ -179,57 +253,160 @@ class MasteringEngine:
             'sample_rate': self.sample_rate
         }
     
+    def _process_tiled(
+        self,
+        audio: np.ndarray,
+        tape_amount: float,
+        tube_amount: float,
+        stereo_width: Optional[float]
+    ) -> np.ndarray:
+        """
+        Saturation and stereo width (steps 3-4) in cache-sized tiles.
+        
+        Each tile goes through every stage before the next tile is read,
+        instead of each stage streaming the whole track through memory.
+        Tile-safe stages are those that are pointwise or causal with state
+        carried between tiles: tape saturation (pointwise), tube saturation
+        (waveshaper plus warmth low-pass) and stereo width (M/S gain plus
+        bass-mono high-pass). The linear-phase EQ, multiband compressor,
+        loudness normalization (its gain depends on the whole processed
+        track) and limiters remain whole-track passes.
+        
+        Args:
+            audio: Audio after EQ and multiband compression
+            tape_amount: Tape saturation drive (0 to skip)
+            tube_amount: Tube saturation drive (0 to skip)
+            stereo_width: Width percentage (None to skip)
+            
+        Returns:
+            Processed audio
+        """
+        if tape_amount <= 0 and tube_amount <= 0 and stereo_width is None:
+            return audio
+        
+        output = None
+        tube_zi = None
+        width_zi = None
+        
+        for start in range(0, audio.shape[-1], self.TILE_SIZE):
+            block = audio[..., start:start + self.TILE_SIZE]
+            
+            if tape_amount > 0:
+                block = self.saturator.tape_saturation_block(block, drive=tape_amount, mix=0.3)
+            
+            if tube_amount > 0:
+                block, tube_zi = self.saturator.tube_saturation_block(
+                    block, drive=tube_amount, warmth=0.2, mix=0.25, zi=tube_zi
+                )
+            
+            if stereo_width is not None:
+                block, width_zi = self.stereo.adjust_width_block(
+                    block, stereo_width, safe_bass=True, zi=width_zi
+                )
+            
+            if output is None:
+                output = np.empty(block.shape[:-1] + audio.shape[-1:], dtype=block.dtype)
+            output[..., start:start + self.TILE_SIZE] = block
+        
+        return output
+    
     def _final_loudness_match(
         self,
         audio: np.ndarray,
         target_lufs: float,
         ceiling_dbTP: float
-    ) -> np.ndarray:
-        """Final loudness adjustment with iterative limiting."""
+    ) -> Tuple[np.ndarray, Dict]:
+        """
+        Final loudness adjustment with iterative limiting.
+        
+        A plain gain shifts the level metrics by exactly its dB value, so
+        the audio is only re-analyzed after the limiter has run. Gains are
+        applied in place, so the caller must own ``audio``.
+        
+        Returns:
+            Tuple of (audio, loudness metrics of that audio)
+        """
         
         max_iterations = 3
+        metrics = self.loudness_analyzer.analyze(audio)
         
         for i in range(max_iterations):
-            metrics = self.loudness_analyzer.analyze(audio)
             lufs_delta = target_lufs - metrics['lufs_integrated']
             
             if abs(lufs_delta) < 0.5:
                 break
             
-            # Apply gain adjustment
+            # Apply gain adjustment (in place: no second track-sized buffer)
             gain_db = lufs_delta * 0.7  # Conservative adjustment
             gain_linear = 10 ** (gain_db / 20)
-            audio = audio * gain_linear
+            audio *= gain_linear
             
-            # Re-limit if needed
-            if metrics['true_peak_dbTP'] > ceiling_dbTP:
+            # Re-limit only if the gain pushed the true peak over the
+            # ceiling (known exactly from the metrics, with a little slack
+            # for the oversampled peak estimate)
+            metrics = self.loudness_analyzer.apply_gain(metrics, gain_db)
+            if metrics['true_peak_dbTP'] > ceiling_dbTP + 0.05:
                 audio = self.limiter.process(audio, ceiling_db=ceiling_dbTP)
+                metrics = self.loudness_analyzer.analyze(audio)
         
-        return audio
+        return audio, metrics
     
     def _check_mono_compatibility(self, audio: np.ndarray) -> Dict:
         """Check mono compatibility of stereo audio."""
         
         if audio.ndim < 2:
-            return {'mono_compatible': True, 'correlation': 1.0}
+            # Mono is its own fold-down: mid is the signal, side is silent
+            sum_squares = 0.0
+            for start in range(0, audio.size, self.STATS_BLOCK_SIZE):
+                block = audio[start:start + self.STATS_BLOCK_SIZE]
+                sum_squares += float(np.dot(block, block))
+            
+            return {
+                'mono_compatible': True,
+                'correlation': 1.0,
+                'mono_stereo_ratio': 1.0,
+                'mid_rms': float(np.sqrt(sum_squares / max(audio.size, 1))),
+                'side_rms': 0.0
+            }
         
         left = audio[0]
         right = audio[1]
+        n = left.size
+        
+        # Channel sums and products, from which every statistic below
+        # follows. Dot products square and sum without full-length
+        # temporaries; per-block partials are accumulated in float64 so
+        # float32 audio keeps full precision on long tracks.
+        sums = np.zeros(5)
+        for start in range(0, n, self.STATS_BLOCK_SIZE):
+            l = left[start:start + self.STATS_BLOCK_SIZE]
+            r = right[start:start + self.STATS_BLOCK_SIZE]
+            sums += (l.sum(dtype=np.float64), r.sum(dtype=np.float64),
+                     np.dot(l, l), np.dot(r, r), np.dot(l, r))
+        sum_l, sum_r, sum_ll, sum_rr, sum_lr = sums
         
-        # Calculate correlation
-        correlation = np.corrcoef(left, right)[0, 1]
+        # Calculate correlation (NaN if a channel is constant)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation = np.clip((n * sum_lr - sum_l * sum_r) / np.sqrt(
+                max(n * sum_ll - sum_l ** 2, 0.0) * max(n * sum_rr - sum_r ** 2, 0.0)
+            ), -1.0, 1.0)
         
-        # Check for phase issues
-        mono = left + right
-        mono_rms = np.sqrt(np.mean(mono ** 2))
-        stereo_rms = np.sqrt(np.mean((left ** 2 + right ** 2)))
+        # Check for phase issues: level of the mono fold-down (mid) against
+        # the per-channel RMS level, so in-phase material reads 1.0 and
+        # uncorrelated material 0.707 (-3 dB), as in
+        # StereoProcessor.check_mono_compatibility
+        mid_rms = np.sqrt(max(sum_ll + sum_rr + 2 * sum_lr, 0.0) / (4 * n))
+        side_rms = np.sqrt(max(sum_ll + sum_rr - 2 * sum_lr, 0.0) / (4 * n))
+        stereo_rms = np.sqrt((sum_ll + sum_rr) / (2 * n))
         
-        ratio = mono_rms / (stereo_rms + 1e-10)
+        ratio = mid_rms / (stereo_rms + 1e-10)
         
         return {
-            'mono_compatible': correlation > 0.5 and ratio > 0.7,
+            'mono_compatible': bool(correlation > 0.5 and ratio > 0.5),  # Less than 6 dB fold-down loss
             'correlation': float(correlation),
-            'mono_stereo_ratio': float(ratio)
+            'mono_stereo_ratio': float(ratio),
+            'mid_rms': float(mid_rms),
+            'side_rms': float(side_rms)
         }
     
     def _auto_qc(
@@ -27,9 +27,9 @@ class ProLimiter:
         
         logger.info(f"Pro Limiter (simple): ceiling={ceiling_db}dB")
         
-        # Ensure stereo
+        # Work on (channels, samples); mono runs as a single channel
         if audio.ndim == 1:
-            audio = np.stack([audio, audio])
+            audio = audio.reshape(1, -1)
             was_mono = True
         else:
             was_mono = False
@@ -61,7 +61,7 @@ class ProLimiter:
         
         # Return to original shape
         if was_mono:
-            output = np.mean(output, axis=0)
+            output = output[0]
         
         gr_db = -20 * np.log10(np.min(gain_reduction) + 1e-10)
         logger.info(f"Pro Limiter: Max GR = {gr_db:.1f} dB")
@@ -89,18 +89,22 @@ class ProLimiter:
         release_samples = int(release_ms * self.sample_rate / 1000)
         release_coef = np.exp(-1.0 / release_samples)
         
-        # Instant attack, smooth release
-        smoothed = np.zeros_like(gain_reduction)
-        smoothed[0] = gain_reduction[0]
+        # Instant attack, smooth release. The recursion runs over Python
+        # floats: indexing NumPy scalars (float32 ones especially) costs
+        # several times more per sample
+        target = gain_reduction.tolist()
+        smoothed = [target[0]]
+        previous = target[0]
         
-        for i in range(1, len(gain_reduction)):
-            if gain_reduction[i] < smoothed[i-1]:
-                smoothed[i] = gain_reduction[i]  # Attack
+        for value in target[1:]:
+            if value < previous:
+                previous = value  # Attack
             else:
-                smoothed[i] = release_coef * smoothed[i-1] + (1 - release_coef) * gain_reduction[i]  # Release
+                previous = release_coef * previous + (1 - release_coef) * value  # Release
+            smoothed.append(previous)
         
-        # Broadcast to stereo
-        smoothed = np.tile(smoothed, (audio.shape[0], 1))
+        # Broadcast to stereo, in the audio's precision
+        smoothed = np.tile(np.array(smoothed, dtype=gain_reduction.dtype), (audio.shape[0], 1))
         
         return smoothed
     
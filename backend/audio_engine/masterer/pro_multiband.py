@@ -98,9 +98,10 @@ class ProMultibandCompressor:
             output = (1 - parallel_mix) * audio_mono + parallel_mix * output
             logger.info(f"  Parallel mix: {parallel_mix*100:.0f}%")
         
-        # Match original shape
+        # Match original shape and precision (the crossovers run in float64)
         if is_stereo:
             output = np.tile(output, (audio.shape[0], 1))
+        output = output.astype(audio.dtype, copy=False)
         
         return {
             'audio': output,
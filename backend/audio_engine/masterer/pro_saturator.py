@@ -5,7 +5,7 @@ Studio-grade analog modeling and harmonic exciter
 
 import numpy as np
 from scipy import signal
-from typing import Optional
+from typing import Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,6 +28,10 @@ class ProSaturator:
             sample_rate: Audio sample rate
         """
         self.sample_rate = sample_rate
+        
+        # Tube warmth low-pass as SOS, rebuilt if sample_rate changes
+        self._warmth_sos = None
+        self._warmth_sos_rate = None
     
     def tape_saturation(
         self,
@@ -50,6 +54,29 @@ class ProSaturator:
         """
         logger.info(f"Tape saturation: drive={drive:.2f}, bias={bias:.2f}")
         
+        return self.tape_saturation_block(audio, drive, bias, mix)
+    
+    def tape_saturation_block(
+        self,
+        audio: np.ndarray,
+        drive: float = 0.5,
+        bias: float = 0.0,
+        mix: float = 1.0
+    ) -> np.ndarray:
+        """
+        tape_saturation on one block of a longer signal
+        
+        Tape saturation is pointwise, so blocks need no carried state.
+        
+        Args:
+            audio: Input block
+            drive: Saturation drive (0-1)
+            bias: Tape bias (-1 to 1)
+            mix: Wet/dry mix (0-1)
+            
+        Returns:
+            Saturated block
+        """
         # Apply drive
         driven = audio * (1 + drive * 3)
         
@@ -94,17 +121,41 @@ class ProSaturator:
         """
         logger.info(f"Tube saturation: drive={drive:.2f}, warmth={warmth:.2f}")
         
+        output, _ = self.tube_saturation_block(audio, drive, warmth, mix)
+        
+        return output
+    
+    def tube_saturation_block(
+        self,
+        audio: np.ndarray,
+        drive: float = 0.5,
+        warmth: float = 0.5,
+        mix: float = 1.0,
+        zi: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        tube_saturation on one block of a longer signal
+        
+        The waveshaper is pointwise and the warmth low-pass is causal, with
+        its state carried from block to block, so processing a signal in
+        consecutive blocks gives the same result as tube_saturation.
+        
+        Args:
+            audio: Input block (samples along the last axis)
+            drive: Saturation drive (0-1)
+            warmth: Warmth amount (0-1)
+            mix: Wet/dry mix (0-1)
+            zi: Filter state returned for the previous block (None to start)
+            
+        Returns:
+            Tuple of (saturated block, filter state for the next block)
+        """
         # Apply drive
         driven = audio * (1 + drive * 5)
         
         # Tube saturation curve (asymmetric soft clipping)
         # Positive side: softer clipping
-        pos_mask = driven > 0
-        neg_mask = driven <= 0
-        
-        saturated = np.zeros_like(driven)
-        saturated[pos_mask] = np.tanh(driven[pos_mask] * 0.8)
-        saturated[neg_mask] = np.tanh(driven[neg_mask] * 1.2)
+        saturated = np.tanh(np.where(driven > 0, driven * 0.8, driven * 1.2))
         
         # Add odd harmonics (tube characteristic)
         saturated = saturated + 0.15 * drive * np.tanh(driven * 2) ** 3
@@ -112,9 +163,14 @@ class ProSaturator:
         # Add warmth (low-frequency emphasis)
         if warmth > 0:
             # Low-pass filter for warmth
-            sos = signal.butter(2, 500, fs=self.sample_rate, output='sos')
-            warm_signal = signal.sosfilt(sos, saturated)
-            saturated = saturated + warmth * 0.2 * warm_signal
+            if self._warmth_sos_rate != self.sample_rate:
+                self._warmth_sos = signal.butter(2, 500, fs=self.sample_rate, output='sos')
+                self._warmth_sos_rate = self.sample_rate
+            sos = self._warmth_sos
+            if zi is None:
+                zi = np.zeros((len(sos),) + saturated.shape[:-1] + (2,))
+            warm_signal, zi = signal.sosfilt(sos, saturated, zi=zi)
+            saturated = saturated + warmth * 0.2 * warm_signal.astype(saturated.dtype, copy=False)
         
         # Normalize
         saturated = saturated / (1 + drive * 0.4)
@@ -122,7 +178,7 @@ class ProSaturator:
         # Mix with dry
         output = (1 - mix) * audio + mix * saturated
         
-        return output
+        return output, zi
     
     def harmonic_exciter(
         self,
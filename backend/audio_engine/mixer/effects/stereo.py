@@ -23,6 +23,10 @@ class StereoProcessor:
             sample_rate: Audio sample rate
         """
         self.sample_rate = sample_rate
+        
+        # Bass-mono high-pass as SOS, rebuilt if the cutoff or rate changes
+        self._bass_sos = None
+        self._bass_sos_key = None
     
     def adjust_width(
         self,
@@ -49,6 +53,39 @@ class StereoProcessor:
             logger.warning("Input is mono, returning unchanged")
             return audio
         
+        output, _ = self.adjust_width_block(audio, width_percent, safe_bass, bass_mono_freq)
+        
+        # Safety check: prevent excessive width
+        if width_percent > 140:
+            logger.warning(f"Width {width_percent}% exceeds safe limit (140%)")
+        
+        return output
+    
+    def adjust_width_block(
+        self,
+        audio: np.ndarray,
+        width_percent: float = 100.0,
+        safe_bass: bool = True,
+        bass_mono_freq: float = 120.0,
+        zi: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        adjust_width on one block of a longer stereo signal
+        
+        Width is pointwise in M/S apart from the causal bass-mono high-pass,
+        whose state is carried from block to block, so processing a signal
+        in consecutive blocks gives the same result as adjust_width.
+        
+        Args:
+            audio: Stereo block (2, samples)
+            width_percent: Width percentage (0-200%)
+            safe_bass: Keep bass frequencies mono for compatibility
+            bass_mono_freq: Frequency below which to keep mono
+            zi: Filter state returned for the previous block (None to start)
+            
+        Returns:
+            Tuple of (width-adjusted block, filter state for the next block)
+        """
         # Convert to M/S
         mid, side = self._to_mid_side(audio)
         
@@ -58,19 +95,14 @@ class StereoProcessor:
         
         # Keep bass mono if requested
         if safe_bass:
-            side_adjusted = self._mono_bass(
+            side_adjusted, zi = self._mono_bass(
                 side_adjusted,
-                bass_mono_freq
+                bass_mono_freq,
+                zi
             )
         
         # Convert back to L/R
-        output = self._to_left_right(mid, side_adjusted)
-        
-        # Safety check: prevent excessive width
-        if width_percent > 140:
-            logger.warning(f"Width {width_percent}% exceeds safe limit (140%)")
-        
-        return output
+        return self._to_left_right(mid, side_adjusted), zi
     
     def haas_effect(
         self,
@@ -232,19 +264,29 @@ class StereoProcessor:
             }
         
         left, right = audio[0], audio[1]
-        
-        # Calculate correlation
-        correlation = np.corrcoef(left, right)[0, 1]
+        n = left.size
+        
+        # Channel energies and cross term; the correlation and both levels
+        # follow from these without stacking or summing the channels
+        sum_ll = np.dot(left, left)
+        sum_rr = np.dot(right, right)
+        sum_lr = np.dot(left, right)
+        mean_l = left.mean()
+        mean_r = right.mean()
+        
+        # Calculate correlation (NaN if a channel is constant)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation = np.clip((sum_lr / n - mean_l * mean_r) / np.sqrt(
+                max(sum_ll / n - mean_l ** 2, 0.0) * max(sum_rr / n - mean_r ** 2, 0.0)
+            ), -1.0, 1.0)
         
         # Check for phase issues (negative correlation)
         phase_issues = correlation < 0.1
         
-        # Mono sum
-        mono = (left + right) / 2
-        
-        # Check for cancellation
-        mono_level = np.sqrt(np.mean(mono ** 2))
-        stereo_level = np.sqrt(np.mean((left ** 2 + right ** 2) / 2))
+        # Check for cancellation: level of the mono sum (L + R) / 2 against
+        # the per-channel level
+        mono_level = np.sqrt(max(sum_ll + sum_rr + 2 * sum_lr, 0.0) / (4 * n))
+        stereo_level = np.sqrt((sum_ll + sum_rr) / (2 * n))
         
         cancellation_db = 20 * np.log10((mono_level / (stereo_level + 1e-10)) + 1e-10)
         
@@ -338,26 +380,35 @@ class StereoProcessor:
     def _mono_bass(
         self,
         side: np.ndarray,
-        cutoff_freq: float
-    ) -> np.ndarray:
+        cutoff_freq: float,
+        zi: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
         Make bass frequencies mono in side signal
         
         Args:
             side: Side signal
             cutoff_freq: Frequency below which to remove side
+            zi: High-pass state carried from a previous block (None to start)
             
         Returns:
-            Bass-mono side signal
+            Tuple of (bass-mono side signal, high-pass state)
         """
         from scipy import signal
         
         # High-pass filter the side signal
-        sos = signal.butter(
-            4, cutoff_freq, 'high',
-            fs=self.sample_rate, output='sos'
-        )
+        if self._bass_sos_key != (cutoff_freq, self.sample_rate):
+            self._bass_sos = signal.butter(
+                4, cutoff_freq, 'high',
+                fs=self.sample_rate, output='sos'
+            )
+            self._bass_sos_key = (cutoff_freq, self.sample_rate)
+        sos = self._bass_sos
+        
+        if zi is None:
+            zi = np.zeros((len(sos),) + side.shape[:-1] + (2,))
         
-        side_filtered = signal.sosfilt(sos, side)
+        # sosfilt works in float64; hand back the side signal's precision
+        side_filtered, zi = signal.sosfilt(sos, side, zi=zi)
         
-        return side_filtered
+        return side_filtered.astype(side.dtype, copy=False), zi
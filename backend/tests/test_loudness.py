@@ -0,0 +1,53 @@
+"""
+Regression tests for LoudnessAnalyzer's integrated loudness
+"""
+
+import numpy as np
+import pyloudnorm as pyln
+import pytest
+
+from audio_engine.analyzer import LoudnessAnalyzer
+
+
+# Non-round durations whose rounded block count runs the last gating
+# block past the end of the signal, plus a few round ones
+DURATIONS = [0.5, 1.0, 3.06, 3.07, 4.13, 10.0, 10.06, 17.31, 61.27]
+
+
+@pytest.mark.parametrize('sample_rate', [44100, 48000])
+@pytest.mark.parametrize('duration', DURATIONS)
+def test_integrated_loudness_matches_pyloudnorm(sample_rate, duration):
+    rng = np.random.default_rng(0)
+    n = int(round(duration * sample_rate))
+    t = np.arange(n) / sample_rate
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 0.3 * t)
+    audio = 0.3 * envelope * rng.standard_normal((2, n))
+    
+    analyzer = LoudnessAnalyzer(sample_rate)
+    expected = pyln.Meter(sample_rate).integrated_loudness(audio.T)
+    
+    assert analyzer.analyze(audio)['lufs_integrated'] == pytest.approx(expected, abs=1e-6)
+
+
+def _sine_segments(levels_dbfs, seconds, sample_rate):
+    """Stereo 1 kHz sine, seconds long at each level in turn"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    tone = np.sin(2 * np.pi * 1000 * t)
+    mono = np.concatenate([10 ** (level / 20) * tone for level in levels_dbfs])
+    return np.stack([mono, mono])
+
+
+# EBU Tech 3342 loudness range test signals: 20 s per level
+@pytest.mark.parametrize('levels, expected_lra', [
+    ((-20, -30), 10.0),
+    ((-20, -15), 5.0),
+    ((-40, -20), 20.0),
+    ((-50, -35, -20, -35, -50), 15.0),
+])
+def test_loudness_range_ebu_tech_3342(levels, expected_lra):
+    sample_rate = 48000
+    audio = _sine_segments(levels, 20, sample_rate)
+    
+    lra = LoudnessAnalyzer(sample_rate).analyze(audio)['lra']
+    
+    assert lra == pytest.approx(expected_lra, abs=0.1)